@@ -1,22 +1,88 @@
-from flask import Flask, render_template
+import os
+from flask import Flask, render_template, request, g
 from flask_cors import CORS
-from controllers.auth_controller import auth_bp
-from controllers.license_controller import license_bp
-from controllers.ticket_controller import ticket_bp
+from config import load_config, require_db_password
 
-app = Flask(__name__, static_folder='../frontend', static_url_path='', template_folder='../frontend')
-CORS(app) # Enable CORS for all routes (important during development)
+# Carries the time of the browser's last write, so whichever worker serves its next
+# request routes reads to the primary for a while (read-your-writes) and to replicas otherwise.
+LAST_WRITE_COOKIE = 'lt_last_write'
 
-# Register Blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(license_bp)
-app.register_blueprint(ticket_bp)
+def create_app(config=None):
+    """
+    Builds the Flask application. `config` is merged over load_config(), i.e. the
+    APP_ENV, DB_*, PORT, FLASK_DEBUG and SEARCH_INDEX_* environment variables,
+    with a partial DB_CONFIG merged over the environment's one.
+    Controllers and models (and with them mysql.connector) are imported here
+    rather than at module import, so importing this module stays cheap.
+    """
+    defaults = load_config()
+    config = {**defaults, **(config or {})}
+    config['DB_CONFIG'] = {**defaults['DB_CONFIG'], **config['DB_CONFIG']}
+    require_db_password(config['DB_CONFIG'])
 
-# --- Frontend Serving Route ---
-@app.route('/')
-def serve_frontend():
-    """Serves the main frontend HTML file."""
-    return render_template('index.html')
+    from models import db_connection
+    db_connection.configure(config)
+
+    if config['TICKET_WRITE_BEHIND']:
+        # The journal and its flusher start lazily in each worker (after fork)
+        from services import ticket_journal
+        ticket_journal.enable(config['TICKET_JOURNAL_DIR'])
+
+    from controllers.auth_controller import auth_bp
+    from controllers.license_controller import license_bp
+    from controllers.ticket_controller import ticket_bp
+    from controllers.stats_controller import stats_bp
+
+    app = Flask(__name__, static_folder='../frontend', static_url_path='', template_folder='../frontend')
+    app.config.update(config)
+    CORS(app) # Enable CORS for all routes (important during development)
+
+    # Register Blueprints
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(license_bp)
+    app.register_blueprint(ticket_bp)
+    app.register_blueprint(stats_bp)
+
+    # --- Read-your-writes tracking ---
+    @app.before_request
+    def bind_last_write():
+        try:
+            written_at = float(request.cookies.get(LAST_WRITE_COOKIE, ''))
+        except ValueError:
+            written_at = None
+        g.last_write_at = written_at
+        db_connection.last_write_at.set(written_at)
+
+    @app.after_request
+    def persist_last_write(response):
+        written_at = db_connection.last_write_at.get()
+        if written_at is not None and written_at != g.get('last_write_at'):
+            response.set_cookie(LAST_WRITE_COOKIE, repr(written_at), httponly=True, samesite='Lax',
+                                max_age=db_connection.STICKY_PRIMARY_SECONDS)
+        return response
+
+    # --- Frontend Serving Route ---
+    @app.route('/')
+    def serve_frontend():
+        """Serves the main frontend HTML file."""
+        return render_template('index.html')
+
+    from services.search_index import license_search_index
+    license_search_index.max_bytes = config['SEARCH_INDEX_MAX_MB'] * 1024 * 1024
+
+    # Build the typeahead index up front; if the database is unreachable it is built on first use
+    if config['SEARCH_INDEX_ON_STARTUP']:
+        from models.license_model import get_license_search_rows
+        try:
+            license_search_index.build(*get_license_search_rows())
+        except Exception as e:
+            print(f"WARNING: Could not build license search index at startup: {e}")
+
+    return app
 
 if __name__ == '__main__':
-    app.run(debug=True, port=7878)
\ No newline at end of file
+    # Development server only; see gunicorn.conf.py for the multi-worker entry point
+    os.environ.setdefault('APP_ENV', 'development')
+    dev_config = load_config()
+    debug = dev_config['DEBUG'] if 'FLASK_DEBUG' in os.environ else True
+    create_app(dev_config).run(debug=debug, port=dev_config['PORT'])
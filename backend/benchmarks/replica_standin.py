@@ -0,0 +1,143 @@
+"""
+Embedded stand-in for a primary plus read replicas, for exercising read/write
+routing in models/db_connection.py without any MySQL instance.
+
+install() swaps the connection layer's connect and lag-check functions for
+in-memory connections that answer every query with an empty result and record
+which host served it. Running this module checks the routing end to end through
+the app, with every request served by a fresh interpreter (as by a different
+gunicorn worker) and only the browser's cookies carried between them:
+    python -m benchmarks.replica_standin
+
+To check against real servers instead, start a second local MySQL replicating
+from the first and set DB_REPLICAS (e.g. DB_REPLICAS=localhost:3307).
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Stand-in replicas (DB_REPLICAS entries) and the lag each one reports
+REPLICA_LAGS = {'replica-1:3307': 1, 'replica-2:3308': 30}
+
+served_hosts = []  # host of every connection opened since install()
+
+
+class _StandInCursor:
+    rowcount = 1
+
+    def execute(self, sql, params=()):
+        pass
+
+    def executemany(self, sql, seq_params):
+        pass
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+    def __iter__(self):
+        return iter(())
+
+    def close(self):
+        pass
+
+
+class _StandInConnection:
+    def __init__(self, host, connection_id):
+        self.host = host
+        self.connection_id = connection_id
+
+    def cursor(self, **kwargs):
+        return _StandInCursor()
+
+    def start_transaction(self, **kwargs):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def install(replica_lags):
+    """
+    Routes db_connection to stand-in hosts. `replica_lags` maps "host:port" of
+    each configured replica to the lag it reports (None for a broken replica).
+    """
+    from models import db_connection
+
+    def connect(config):
+        host = f"{config.get('host')}:{config.get('port', 3306)}"
+        served_hosts.append(host)
+        return _StandInConnection(host, len(served_hosts))
+
+    def measure_lag(index):
+        replica = {**db_connection.DB_CONFIG, **db_connection.REPLICA_CONFIGS[index]}
+        return replica_lags.get(f"{replica.get('host')}:{replica.get('port', 3306)}")
+
+    db_connection._connect = connect
+    db_connection._measure_lag = measure_lag
+
+
+_CHILD = r"""
+import json, sys
+from benchmarks import replica_standin
+import app as app_module
+method, path, body, cookie = json.loads(sys.argv[1])
+application = app_module.create_app()
+replica_standin.install(replica_standin.REPLICA_LAGS)
+headers = {'Cookie': f"{app_module.LAST_WRITE_COOKIE}={cookie}"} if cookie else {}
+response = application.test_client(use_cookies=False).open(path, method=method, json=body, headers=headers)
+cookie = None
+for header in response.headers.getlist('Set-Cookie'):
+    name, _, rest = header.partition('=')
+    if name == app_module.LAST_WRITE_COOKIE:
+        cookie = rest.split(';')[0]
+print(json.dumps({'status': response.status_code, 'hosts': replica_standin.served_hosts, 'cookie': cookie}))
+"""
+
+
+def request_in_new_worker(method, path, body=None, cookie=None):
+    """Serves one request in a fresh interpreter; returns status, hosts used and the cookie set."""
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, DB_REPLICAS=','.join(REPLICA_LAGS), DB_POOL_SIZE='0', SEARCH_INDEX_ON_STARTUP='0')
+    env.setdefault('APP_ENV', 'development')
+    output = subprocess.run(
+        [sys.executable, '-c', _CHILD, json.dumps([method, path, body, cookie])],
+        cwd=backend_dir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    from models.db_connection import STICKY_PRIMARY_SECONDS
+
+    checks = []
+
+    def check(label, result, expected_host):
+        ok = result['hosts'] == [expected_host]
+        checks.append(ok)
+        print(f"{'ok  ' if ok else 'FAIL'} {label}: served by {result['hosts']} (expected {expected_host})")
+
+    check("read without prior write", request_in_new_worker('GET', '/api/licenses'), 'replica-1:3307')
+    write = request_in_new_worker('PUT', '/api/tickets/T-STANDIN', {'status': 'Closed'})
+    check("write", write, 'localhost:3306')
+    check("read right after the write, other worker",
+          request_in_new_worker('GET', '/api/licenses', cookie=write['cookie']), 'localhost:3306')
+    expired = repr(time.time() - STICKY_PRIMARY_SECONDS - 1)
+    check("read after stickiness expired", request_in_new_worker('GET', '/api/licenses', cookie=expired), 'replica-1:3307')
+
+    print(f"{sum(checks)}/{len(checks)} routing checks passed")
+    return all(checks)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,53 @@
+"""
+Measures cold-start latency of the app in fresh interpreter processes.
+
+Each run reports the time to import the app module, build it with create_app()
+and serve a first request, which is what a new worker pays after a deploy or a
+scale-up. Run from the backend directory:
+    python -m benchmarks.startup_benchmark [runs]
+
+Set SEARCH_INDEX_ON_STARTUP=1 (and point DB_* at a database) to include the
+index build; by default it is disabled so the benchmark runs without MySQL.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+_CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import app as app_module
+t1 = time.perf_counter()
+application = app_module.create_app()
+t2 = time.perf_counter()
+application.test_client().get('/')
+t3 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'create_app': t2 - t1, 'first_request': t3 - t2, 'total': t3 - t0}))
+"""
+
+
+def run_once(env):
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run(
+        [sys.executable, '-c', _CHILD], cwd=backend_dir, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(runs):
+    env = dict(os.environ)
+    env.setdefault('SEARCH_INDEX_ON_STARTUP', '0')
+    env.setdefault('DB_POOL_SIZE', '0')
+    env.setdefault('APP_ENV', 'development')
+    results = [run_once(env) for _ in range(runs)]
+    print(f"Runs: {runs}")
+    for phase in ('import', 'create_app', 'first_request', 'total'):
+        values = [r[phase] * 1000 for r in results]
+        print(f"{phase:>14}: median {statistics.median(values):7.1f} ms   max {max(values):7.1f} ms")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
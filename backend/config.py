@@ -0,0 +1,60 @@
+import os
+
+def _flag(value):
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+def _parse_replicas(value):
+    """Parses DB_REPLICAS ("host[:port],host[:port]") into replica config overrides."""
+    replicas = []
+    for entry in (value or '').split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        host, _, port = entry.partition(':')
+        replica = {'host': host}
+        if port:
+            replica['port'] = int(port)
+        replicas.append(replica)
+    return replicas
+
+# Password for the local development database only; every other environment
+# must set DB_PASSWORD
+DEVELOPMENT_DB_PASSWORD = 'Revolt123@'
+
+def load_config(env=None):
+    """
+    Builds the application config from environment variables, falling back to
+    the local development defaults. DB_PASSWORD only has a default when APP_ENV
+    is "development"; elsewhere it is left None and require_db_password() fails.
+    """
+    env = os.environ if env is None else env
+    app_env = env.get('APP_ENV', 'production')
+    return {
+        'APP_ENV': app_env,
+        'DB_CONFIG': {
+            'host': env.get('DB_HOST', 'localhost'),
+            'port': int(env.get('DB_PORT', 3306)),
+            'user': env.get('DB_USER', 'root'),
+            'password': env.get('DB_PASSWORD', DEVELOPMENT_DB_PASSWORD if app_env == 'development' else None),
+            'database': env.get('DB_NAME', 'license_tracker_db')
+        },
+        'REPLICA_CONFIGS': _parse_replicas(env.get('DB_REPLICAS')),
+        # Connections kept per process (per gunicorn worker) for each database host
+        'DB_POOL_SIZE': int(env.get('DB_POOL_SIZE', 5)),
+        'DEBUG': _flag(env.get('FLASK_DEBUG', '0')),
+        'PORT': int(env.get('PORT', 7878)),
+        # Build the typeahead index while creating the app; otherwise it is built
+        # in the background on first use
+        'SEARCH_INDEX_ON_STARTUP': _flag(env.get('SEARCH_INDEX_ON_STARTUP', '1')),
+        # Memory budget for the typeahead index. Every worker keeps and refreshes
+        # its own copy, so the total is this times the number of workers
+        'SEARCH_INDEX_MAX_MB': int(env.get('SEARCH_INDEX_MAX_MB', 128)),
+        # Journal ticket inserts to disk and commit them in batches in the background
+        'TICKET_WRITE_BEHIND': _flag(env.get('TICKET_WRITE_BEHIND', '0')),
+        'TICKET_JOURNAL_DIR': env.get('TICKET_JOURNAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal'))
+    }
+
+def require_db_password(db_config):
+    """Raises RuntimeError if a database config has no password to connect with."""
+    if db_config.get('password') is None:
+        raise RuntimeError("DB_PASSWORD must be set (only APP_ENV=development has a default)")
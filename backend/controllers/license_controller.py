@@ -1,5 +1,11 @@
 from flask import Blueprint, request, jsonify
 from models.license_model import get_all_licenses, create_license, update_license, reactivate_license_db, get_system_analytics
+from models.license_model import get_multi_system_analytics, get_license_search_rows, search_licenses_by_prefix
+from models.license_model import ANALYTICS_DIMENSIONS, ANALYTICS_BUCKETS, ANALYTICS_CATEGORY_PATHS
+from models.records import License, ValidationError
+from models.duplicate_model import get_duplicate_report
+from services.search_index import license_search_index
+from utils.response_encoding import wants_columnar, encode_columnar, build_response, COLUMNAR_MIMETYPE
 import mysql.connector
 
 license_bp = Blueprint('license', __name__)
@@ -8,6 +14,8 @@ license_bp = Blueprint('license', __name__)
 def get_licenses():
     """
     Retrieves licenses from the database, with optional filtering.
+    Clients that accept the columnar media type get a dictionary-encoded
+    "columns + rows" payload; large responses are compressed when accepted.
     """
     try:
         filters = {
@@ -17,14 +25,56 @@ def get_licenses():
             'assignment_date_start': request.args.get('assignment_date_start'),
             'assignment_date_end': request.args.get('assignment_date_end')
         }
-        licenses_data = get_all_licenses(filters)
-        return jsonify(licenses_data)
+        licenses = get_all_licenses(filters)
+        if wants_columnar(request):
+            payload = encode_columnar(License.FIELDS, [record.to_row() for record in licenses])
+            return build_response(request, payload, mimetype=COLUMNAR_MIMETYPE)
+        return build_response(request, licenses)
     except mysql.connector.Error as err:
         return jsonify({'message': 'Database error', 'error': str(err)}), 500
     except Exception as e:
         print(f"ERROR: An unexpected error occurred in get_licenses: {e}")
         return jsonify({'message': 'An unexpected error occurred', 'error': str(e)}), 500
 
+@license_bp.route('/api/licenses/suggest', methods=['GET'])
+def suggest_licenses():
+    """
+    Returns ranked, typo-tolerant typeahead matches on name, email, mobile and
+    ticket ID from the in-memory trigram index. Until the index has loaded
+    (it loads in the background), plain prefix matches come from MySQL.
+    """
+    query = request.args.get('q', '')
+    try:
+        limit = min(int(request.args.get('limit', 10)), 50)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit must be an integer'}), 400
+
+    try:
+        license_search_index.refresh_if_due(get_license_search_rows)
+        if license_search_index.ready:
+            return jsonify(license_search_index.suggest(query, limit))
+        query = query.strip()
+        return jsonify(search_licenses_by_prefix(query, limit) if query else [])
+    except mysql.connector.Error as err:
+        return jsonify({'message': 'Database error', 'error': str(err)}), 500
+    except Exception as e:
+        print(f"ERROR: An unexpected error occurred in suggest_licenses: {e}")
+        return jsonify({'message': 'An unexpected error occurred', 'error': str(e)}), 500
+
+@license_bp.route('/api/licenses/duplicates', methods=['GET'])
+def get_license_duplicates():
+    """
+    Reports people (by normalized email/mobile) holding Active seats in several
+    systems, and keys with more than one Active license in the same system.
+    """
+    try:
+        return jsonify(get_duplicate_report())
+    except mysql.connector.Error as err:
+        return jsonify({'success': False, 'message': 'Database error', 'error': str(err)}), 500
+    except Exception as e:
+        print(f"ERROR: An unexpected error occurred in get_license_duplicates: {e}")
+        return jsonify({'success': False, 'message': 'An unexpected error occurred', 'error': str(e)}), 500
+
 @license_bp.route('/api/licenses', methods=['POST'])
 def add_license():
     """
@@ -33,16 +83,13 @@ def add_license():
     data = request.get_json()
     print(f"DEBUG: Received data for add_license: {data}")
 
-    required_fields = ['ticketId', 'system', 'name', 'assignmentDate', 'requestedDate', 'requestorName']
-    if not all(field in data for field in required_fields):
-        missing = [field for field in required_fields if field not in data]
-        print(f"ERROR: Missing required fields for add_license: {missing}")
-        return jsonify({'success': False, 'message': f'Missing required license data: {", ".join(missing)}'}), 400
-
     try:
         license_id = create_license(data)
         print(f"DEBUG: License added successfully: {license_id}")
         return jsonify({'success': True, 'message': 'License added successfully', 'id': license_id}), 201
+    except ValidationError as err:
+        print(f"ERROR: Invalid request body for add_license: {err}")
+        return jsonify({'success': False, 'message': str(err)}), 400
     except mysql.connector.Error as err:
         return jsonify({'success': False, 'message': 'Database error', 'error': str(err)}), 500
     except Exception as e:
@@ -105,6 +152,40 @@ def reactivate_license(license_id):
         return jsonify({'success': False, 'message': 'An unexpected error occurred', 'error': str(e)}), 500
 
 # Analytics Routes
+@license_bp.route('/api/analytics', methods=['GET'])
+def get_analytics():
+    """
+    Retrieves license counts for one or more systems in a single query.
+    Query params: systems (comma-separated), group_by (comma-separated subset of
+    status, request_type, hub, city, category), bucket (day/week/month/quarter),
+    start_date, end_date and status.
+    """
+    systems = [s.strip().upper() for s in request.args.get('systems', '').split(',') if s.strip()]
+    systems = systems or list(ANALYTICS_CATEGORY_PATHS.keys())
+    group_by = [g.strip() for g in request.args.get('group_by', '').split(',') if g.strip()]
+    bucket = request.args.get('bucket', 'month')
+
+    invalid = [g for g in group_by if g not in ANALYTICS_DIMENSIONS]
+    if invalid:
+        return jsonify({'success': False, 'message': f'Invalid group_by dimensions: {", ".join(invalid)}'}), 400
+    if bucket not in ANALYTICS_BUCKETS:
+        return jsonify({'success': False, 'message': f'Invalid bucket: {bucket}'}), 400
+
+    try:
+        return jsonify(get_multi_system_analytics(
+            systems,
+            list(dict.fromkeys(group_by)),
+            bucket,
+            request.args.get('start_date'),
+            request.args.get('end_date'),
+            request.args.get('status')
+        ))
+    except mysql.connector.Error as err:
+        return jsonify({'success': False, 'message': 'Database error', 'error': str(err)}), 500
+    except Exception as e:
+        print(f"ERROR: An unexpected error occurred in get_analytics: {e}")
+        return jsonify({'success': False, 'message': 'An unexpected error occurred', 'error': str(e)}), 500
+
 @license_bp.route('/api/lsq_analytics', methods=['GET'])
 def get_lsq_analytics():
     """Retrieves LSQ-specific license data for analytics."""
@@ -0,0 +1,12 @@
+from flask import Blueprint, jsonify
+from models.query_builder import get_statement_cache_stats
+
+stats_bp = Blueprint('stats', __name__)
+
+@stats_bp.route('/api/stats/statements', methods=['GET'])
+def get_statement_stats():
+    """
+    Reports prepared-statement cache hits, misses, evictions, re-prepares and
+    hit rate for this worker process.
+    """
+    return jsonify({'success': True, 'statements': get_statement_cache_stats()})
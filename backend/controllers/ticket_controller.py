@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
 from models.ticket_model import get_all_tickets, create_ticket, update_ticket
+from models.records import ValidationError
+from utils.response_encoding import build_response
 import mysql.connector
 
 ticket_bp = Blueprint('ticket', __name__)
@@ -7,11 +9,15 @@ ticket_bp = Blueprint('ticket', __name__)
 @ticket_bp.route('/api/tickets', methods=['GET'])
 def get_tickets():
     """
-    Retrieves all tickets from the database.
+    Retrieves tickets from the database, optionally bounded by timestamp.
     """
     try:
-        tickets_data = get_all_tickets()
-        return jsonify(tickets_data)
+        filters = {
+            'timestamp_start': request.args.get('timestamp_start'),
+            'timestamp_end': request.args.get('timestamp_end')
+        }
+        tickets = get_all_tickets(filters)
+        return build_response(request, tickets)
     except mysql.connector.Error as err:
         return jsonify({'message': 'Database error', 'error': str(err)}), 500
     except Exception as e:
@@ -26,16 +32,13 @@ def add_ticket():
     data = request.get_json()
     print(f"DEBUG: Received data for add_ticket: {data}")
 
-    required_fields = ['ticketId', 'action', 'status', 'timestamp']
-    if not all(field in data for field in required_fields):
-        missing = [field for field in required_fields if field not in data]
-        print(f"ERROR: Missing required fields for add_ticket: {missing}.")
-        return jsonify({'success': False, 'message': f'Missing required ticket data: {", ".join(missing)}'}), 400
-
     try:
         create_ticket(data)
         print(f"DEBUG: Ticket added successfully: {data['ticketId']}")
         return jsonify({'success': True, 'message': 'Ticket added successfully'}), 201
+    except ValidationError as err:
+        print(f"ERROR: Invalid request body for add_ticket: {err}")
+        return jsonify({'success': False, 'message': str(err)}), 400
     except mysql.connector.Error as err:
         return jsonify({'success': False, 'message': 'Database error', 'error': str(err)}), 500
     except Exception as e:
@@ -0,0 +1,38 @@
+"""
+Production entry point. Run from the backend directory:
+
+    gunicorn -c gunicorn.conf.py "app:create_app()"
+
+The app is built once in the master (preload_app), so workers start with imports
+done and the search index loaded. Each worker then keeps its own copy of the
+index in step with the database (budget SEARCH_INDEX_MAX_MB per worker) and
+opens its own connection pool after fork, and workers are recycled gracefully
+after a bounded number of requests. Settings come from the environment (see
+config.py); APP_ENV defaults to production, so DB_PASSWORD must be set.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 7878)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = True
+
+# Recycle workers after this many requests (with jitter so they don't restart together)
+max_requests = int(os.environ.get('MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', 100))
+# Give in-flight requests this long to finish when a worker is recycled or on reload
+graceful_timeout = 30
+timeout = 60
+
+# The master only preloads the app, so it connects without pooling and closes each
+# connection after use; workers never inherit its sockets and pool on their own
+# (kept in WORKER_DB_POOL_SIZE so a config reload on HUP still sees the original)
+os.environ.setdefault('WORKER_DB_POOL_SIZE', os.environ.get('DB_POOL_SIZE', '5'))
+WORKER_DB_POOL_SIZE = int(os.environ['WORKER_DB_POOL_SIZE'])
+os.environ['DB_POOL_SIZE'] = '0'
+
+def post_fork(server, worker):
+    # Open this worker's own pool before it accepts requests
+    from models import db_connection
+    db_connection.set_pool_size(WORKER_DB_POOL_SIZE)
+    db_connection.warm_up_pools()
@@ -0,0 +1,131 @@
+from .db_connection import get_db_connection
+import mysql.connector
+from datetime import datetime, date, timedelta
+
+# Inactive licenses assigned before this window are moved to `licenses_archive`
+LICENSE_RETENTION_DAYS = 730
+# Closed tickets older than this window are moved to `tickets_archive`
+TICKET_RETENTION_DAYS = 365
+
+LICENSE_COLUMNS = [
+    'id', 'ticket_id', 'system', 'name', 'mobile', 'email', 'request_type',
+    'assignment_date', 'expiry_date', 'status', 'details_json', 'removal_details_json',
+    'attachment_data', 'created_at', 'updated_at', 'requested_date', 'requestor_name'
+]
+TICKET_COLUMNS = ['id', 'ticket_id', 'action_description', 'status', 'timestamp', 'notes']
+
+def license_archive_cutoff():
+    """Returns the assignment date before which inactive licenses are archived."""
+    return date.today() - timedelta(days=LICENSE_RETENTION_DAYS)
+
+def ticket_archive_cutoff():
+    """Returns the timestamp before which closed tickets are archived."""
+    return datetime.now() - timedelta(days=TICKET_RETENTION_DAYS)
+
+def reaches_archive(start_value, cutoff):
+    """
+    Returns True if a date filter starting at `start_value` (ISO string) may
+    match archived rows, i.e. it is open-ended or begins before the archive cutoff.
+    """
+    if not start_value:
+        return True
+    return str(start_value)[:10] < cutoff.isoformat()[:10]
+
+def _move_rows(cursor, table, archive_table, columns, key, keys):
+    """Copies `keys` rows into the archive table and deletes them from the hot table."""
+    placeholders = ", ".join(["%s"] * len(keys))
+    column_list = ", ".join(f"`{col}`" for col in columns)
+    cursor.execute(
+        f"INSERT INTO `{archive_table}` ({column_list}) SELECT {column_list} FROM `{table}` WHERE `{key}` IN ({placeholders})",
+        tuple(keys)
+    )
+    cursor.execute(f"DELETE FROM `{table}` WHERE `{key}` IN ({placeholders})", tuple(keys))
+
+def archive_inactive_licenses(batch_size=1000, cutoff=None):
+    """
+    Moves inactive licenses assigned before the cutoff into `licenses_archive`,
+    one batch per transaction. Returns the number of rows archived.
+    """
+    cutoff = cutoff or license_archive_cutoff()
+    conn = None
+    cursor = None
+    archived = 0
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(
+                "SELECT `id` FROM `licenses` WHERE `status` = 'Inactive' AND `assignment_date` < %s LIMIT %s FOR UPDATE",
+                (cutoff, batch_size)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                conn.commit()
+                break
+            _move_rows(cursor, 'licenses', 'licenses_archive', LICENSE_COLUMNS, 'id', ids)
+            conn.commit()
+            archived += len(ids)
+            print(f"DEBUG: Archived {len(ids)} licenses (total {archived})")
+        return archived
+    except mysql.connector.Error as err:
+        if conn:
+            conn.rollback()
+        print(f"ERROR: Database error in archive_inactive_licenses: {err}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+def archive_closed_tickets(batch_size=1000, cutoff=None):
+    """
+    Moves closed tickets older than the cutoff into `tickets_archive`,
+    one batch per transaction. Returns the number of rows archived.
+    """
+    cutoff = cutoff or ticket_archive_cutoff()
+    conn = None
+    cursor = None
+    archived = 0
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(
+                "SELECT `id` FROM `tickets` WHERE `status` = 'Closed' AND `timestamp` < %s LIMIT %s FOR UPDATE",
+                (cutoff, batch_size)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                conn.commit()
+                break
+            _move_rows(cursor, 'tickets', 'tickets_archive', TICKET_COLUMNS, 'id', ids)
+            conn.commit()
+            archived += len(ids)
+            print(f"DEBUG: Archived {len(ids)} tickets (total {archived})")
+        return archived
+    except mysql.connector.Error as err:
+        if conn:
+            conn.rollback()
+        print(f"ERROR: Database error in archive_closed_tickets: {err}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+def restore_archived_license(cursor, license_id):
+    """
+    Moves an archived license back into `licenses` using the caller's cursor,
+    so it can be reactivated. Returns True if a row was restored.
+    """
+    column_list = ", ".join(f"`{col}`" for col in LICENSE_COLUMNS)
+    cursor.execute(
+        f"INSERT INTO `licenses` ({column_list}) SELECT {column_list} FROM `licenses_archive` WHERE `id` = %s",
+        (license_id,)
+    )
+    if cursor.rowcount == 0:
+        return False
+    cursor.execute("DELETE FROM `licenses_archive` WHERE `id` = %s", (license_id,))
+    return True
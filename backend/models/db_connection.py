@@ -1,19 +1,179 @@
 import mysql.connector
+import mysql.connector.pooling
+import contextvars
+import random
+import threading
+import time
+from config import load_config, require_db_password
 
-# Database connection configuration
-# IMPORTANT: Replace with your actual MySQL credentials
-DB_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',    # e.g., 'root'
-    'password': 'Revolt123@', # e.g., 'password' or leave empty if no password
-    'database': 'license_tracker_db'
-}
+# Database connection configuration, taken from DB_HOST/DB_USER/DB_PASSWORD/DB_NAME
+# (see config.py) and replaceable at runtime through configure()
+_config = load_config()
+DB_CONFIG = _config['DB_CONFIG']
 
-def get_db_connection():
-    """Establishes and returns a database connection."""
+# Optional read replicas (DB_REPLICAS). Each entry is merged over DB_CONFIG, e.g.
+# [{'host': 'replica-1.internal'}, {'host': 'localhost', 'port': 3307}]
+REPLICA_CONFIGS = _config['REPLICA_CONFIGS']
+
+# Pooled connections per host in this process; 0 disables pooling (see set_pool_size)
+POOL_SIZE = _config['DB_POOL_SIZE']
+
+# Replicas lagging more than this are skipped for reads
+MAX_REPLICA_LAG_SECONDS = 5
+# How long a measured replica lag is trusted before it is checked again
+LAG_CHECK_INTERVAL_SECONDS = 10
+# After a session writes, its reads go to the primary for this long (read-your-writes)
+STICKY_PRIMARY_SECONDS = 10
+
+# Unix time of the caller's last write, carried between requests in a cookie by the
+# app so read-your-writes holds whichever worker process serves the next request
+last_write_at = contextvars.ContextVar('last_write_at', default=None)
+
+_replica_lag = {}   # replica index -> (checked_at, lag seconds or None if unhealthy)
+_pools = {}         # (host, port) -> MySQLConnectionPool, created lazily per process
+_state_lock = threading.Lock()
+
+def configure(config):
+    """
+    Applies an app config (see config.load_config) to the connection layer and
+    discards pools built for the previous settings.
+    """
+    global DB_CONFIG, REPLICA_CONFIGS, POOL_SIZE
+    DB_CONFIG = dict(config['DB_CONFIG'])
+    REPLICA_CONFIGS = list(config.get('REPLICA_CONFIGS', []))
+    POOL_SIZE = config.get('DB_POOL_SIZE', POOL_SIZE)
+    reset_pools()
+
+def set_pool_size(size):
+    """Changes the per-host pool size for this process and discards existing pools."""
+    global POOL_SIZE
+    POOL_SIZE = size
+    reset_pools()
+
+def _get_pool(config):
+    key = (config.get('host'), config.get('port', 3306))
+    with _state_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            # Creating the pool opens all POOL_SIZE connections immediately
+            pool = mysql.connector.pooling.MySQLConnectionPool(
+                pool_name=f"license_tracker_{len(_pools)}",
+                pool_size=POOL_SIZE,
+                # Keep sessions across checkouts so prepared statements cached on
+                # the connection (see query_builder) survive; _connect rolls back instead
+                pool_reset_session=False,
+                **config
+            )
+            _pools[key] = pool
+        return pool
+
+def _connect(config):
+    require_db_password(config)
     try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        return conn
+        if POOL_SIZE > 0:
+            try:
+                conn = _get_pool(config).get_connection()
+                conn.rollback() # end any snapshot left open by the previous borrower
+                return conn
+            except mysql.connector.errors.PoolError:
+                pass # Pool exhausted; fall through to a one-off connection
+        return mysql.connector.connect(**config)
     except mysql.connector.Error as err:
-        print(f"Database connection error: {err}")
+        print(f"Database connection error ({config.get('host')}:{config.get('port', 3306)}): {err}")
         raise # Re-raise to be caught by Flask's error handling or calling function
+
+def reset_pools():
+    """
+    Forgets all pools; their connections are closed as the pools are garbage
+    collected. Must not be used to discard pools inherited across a fork, as
+    closing them would also close the parent's sockets; gunicorn.conf.py keeps
+    the master from pooling so workers never inherit any.
+    """
+    with _state_lock:
+        _pools.clear()
+
+def warm_up_pools():
+    """
+    Opens the primary pool (and replica pools) up front so the first requests
+    after a deploy or worker restart don't pay for connection setup.
+    """
+    if POOL_SIZE <= 0:
+        return
+    for config in [DB_CONFIG] + [{**DB_CONFIG, **replica} for replica in REPLICA_CONFIGS]:
+        try:
+            _get_pool(config)
+        except mysql.connector.Error as err:
+            print(f"WARNING: Could not warm up pool for {config.get('host')}: {err}")
+
+def get_db_connection():
+    """
+    Establishes and returns a connection to the primary. Used for writes, so
+    the caller's subsequent reads stick to the primary for a while.
+    """
+    last_write_at.set(time.time())
+    return _connect(DB_CONFIG)
+
+def _measure_lag(index):
+    """Returns the replica's lag in seconds, or None if it is unreachable or not replicating."""
+    conn = None
+    cursor = None
+    try:
+        conn = _connect({**DB_CONFIG, **REPLICA_CONFIGS[index]})
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SHOW REPLICA STATUS")
+        except mysql.connector.Error:
+            cursor.execute("SHOW SLAVE STATUS")  # MySQL < 8.0.22
+        status = cursor.fetchone()
+        if not status:
+            return None
+        lag = status.get('Seconds_Behind_Source', status.get('Seconds_Behind_Master'))
+        return int(lag) if lag is not None else None
+    except mysql.connector.Error as err:
+        print(f"WARNING: Replica {index} lag check failed: {err}")
+        return None
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+def _replica_lag_for(index):
+    now = time.monotonic()
+    with _state_lock:
+        cached = _replica_lag.get(index)
+    if cached and now - cached[0] < LAG_CHECK_INTERVAL_SECONDS:
+        return cached[1]
+    lag = _measure_lag(index)
+    with _state_lock:
+        _replica_lag[index] = (now, lag)
+    return lag
+
+def _recently_wrote():
+    written_at = last_write_at.get()
+    return written_at is not None and time.time() - written_at < STICKY_PRIMARY_SECONDS
+
+def get_read_connection(primary=False):
+    """
+    Returns a connection for read-only queries. Picks among replicas within
+    MAX_REPLICA_LAG_SECONDS, preferring the least lagged, and falls back to the
+    primary when none qualify or the caller wrote recently. Pass primary=True
+    for reads that must see every committed write; unlike get_db_connection()
+    this does not make the caller's later reads stick to the primary.
+    """
+    if primary or not REPLICA_CONFIGS or _recently_wrote():
+        return _connect(DB_CONFIG)
+
+    candidates = []
+    for index in range(len(REPLICA_CONFIGS)):
+        lag = _replica_lag_for(index)
+        if lag is not None and lag <= MAX_REPLICA_LAG_SECONDS:
+            candidates.append((lag, random.random(), index))
+
+    for _, _, index in sorted(candidates):
+        try:
+            return _connect({**DB_CONFIG, **REPLICA_CONFIGS[index]})
+        except mysql.connector.Error:
+            with _state_lock:
+                _replica_lag[index] = (time.monotonic(), None)
+    return _connect(DB_CONFIG)
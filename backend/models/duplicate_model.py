@@ -0,0 +1,159 @@
+from .db_connection import get_read_connection
+import mysql.connector
+import threading
+import time
+
+# Normalized person keys (generated columns, see database/duplicate_keys.sql)
+DUPLICATE_KEY_COLUMNS = ('email_key', 'mobile_key')
+
+# Recompute only the touched keys unless more than this many licenses changed
+MAX_INCREMENTAL_LICENSES = 500
+# Full recompute interval, a safety net for changes `updated_at` does not show
+FULL_REFRESH_SECONDS = 600
+# Changes are looked up from this long before the previous refresh, so a write
+# whose transaction committed after that refresh (with an earlier `updated_at`) is not missed
+CHANGE_OVERLAP_SECONDS = 60
+# Large enough that GROUP_CONCAT never silently truncates a group's license ids
+GROUP_CONCAT_MAX_LEN = 16 * 1024 * 1024
+
+# watermark: database time the next change lookup starts from;
+# seen: (id, updated_at) changes already applied within the overlap window
+_report = {'entries': None, 'built_at': 0.0, 'watermark': None, 'seen': frozenset()}
+_report_lock = threading.Lock()
+
+def _key_filter(key_column, keys):
+    if keys is None:
+        return "", []
+    return f" AND `{key_column}` IN ({', '.join(['%s'] * len(keys))})", list(keys)
+
+def _query_groups(cursor, key_column, keys=None):
+    """
+    Runs the set-based grouping for one key column, optionally restricted to
+    `keys`, and returns report entries keyed for the cache.
+    """
+    entries = {}
+    key_sql, key_params = _key_filter(key_column, keys)
+
+    cursor.execute(f"""
+        SELECT `{key_column}` AS person_key, COUNT(DISTINCT `system`) AS system_count,
+               GROUP_CONCAT(DISTINCT `system` ORDER BY `system`) AS systems,
+               GROUP_CONCAT(`id`) AS license_ids
+        FROM `licenses`
+        WHERE `status` = 'Active' AND `{key_column}` IS NOT NULL{key_sql}
+        GROUP BY `{key_column}`
+        HAVING system_count > 1
+    """, tuple(key_params))
+    for row in cursor.fetchall():
+        entries[('cross_system', key_column, row['person_key'])] = {
+            'key_type': key_column,
+            'key': row['person_key'],
+            'systems': row['systems'].split(','),
+            'license_ids': row['license_ids'].split(',')
+        }
+
+    cursor.execute(f"""
+        SELECT `{key_column}` AS person_key, `system`, COUNT(*) AS active_count,
+               GROUP_CONCAT(`id`) AS license_ids
+        FROM `licenses`
+        WHERE `status` = 'Active' AND `{key_column}` IS NOT NULL{key_sql}
+        GROUP BY `{key_column}`, `system`
+        HAVING active_count > 1
+    """, tuple(key_params))
+    for row in cursor.fetchall():
+        entries[('same_system', key_column, row['person_key'], row['system'])] = {
+            'key_type': key_column,
+            'key': row['person_key'],
+            'system': row['system'],
+            'active_count': row['active_count'],
+            'license_ids': row['license_ids'].split(',')
+        }
+    return entries
+
+def _changed_licenses(cursor, since):
+    """Returns {(id, updated_at): (email_key, mobile_key)} for licenses written since `since`."""
+    cursor.execute(
+        f"SELECT `id`, `updated_at`, {', '.join(f'`{col}`' for col in DUPLICATE_KEY_COLUMNS)} "
+        "FROM `licenses` WHERE `updated_at` >= %s",
+        (since,)
+    )
+    return {(row['id'], row['updated_at']): row for row in cursor.fetchall()}
+
+def _refresh_keys(cursor, entries, changed):
+    """
+    Recomputes the report entries for every key the changed licenses hold now
+    or were cached under before (e.g. an email that was edited away).
+    """
+    changed_ids = {license_id for license_id, _ in changed}
+    touched = {col: set() for col in DUPLICATE_KEY_COLUMNS}
+    for row in changed.values():
+        for col in DUPLICATE_KEY_COLUMNS:
+            if row[col]:
+                touched[col].add(row[col])
+    for cache_key, entry in entries.items():
+        if changed_ids.intersection(entry['license_ids']):
+            touched[cache_key[1]].add(cache_key[2])
+
+    for col, keys in touched.items():
+        if not keys:
+            continue
+        for cache_key in [k for k in entries if k[1] == col and k[2] in keys]:
+            del entries[cache_key]
+        entries.update(_query_groups(cursor, col, keys))
+
+def get_duplicate_report():
+    """
+    Returns people holding Active seats in several systems and keys with more
+    than one Active license in the same system. The result is cached; each call
+    looks up licenses written since the last refresh (by any process, via
+    `updated_at`) and recomputes only their keys.
+    """
+    with _report_lock:
+        report = dict(_report)
+
+    conn = None
+    cursor = None
+    try:
+        # The primary, so the refresh never caches a result missing recent writes
+        conn = get_read_connection(primary=True)
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SET SESSION group_concat_max_len = %s", (GROUP_CONCAT_MAX_LEN,))
+        cursor.execute("SELECT NOW() AS now, NOW() - INTERVAL %s SECOND AS watermark", (CHANGE_OVERLAP_SECONDS,))
+        clock = cursor.fetchone()
+
+        # All reads below share one snapshot, so every change listed here is
+        # reflected in the entries computed from it
+        entries = report['entries']
+        full = entries is None or time.monotonic() - report['built_at'] > FULL_REFRESH_SECONDS
+        changed = _changed_licenses(cursor, clock['watermark'] if full else report['watermark'])
+        # Changes stamped in the current second are re-applied next time, since a
+        # later write in the same second would carry the same `updated_at`
+        seen = frozenset(change for change in changed if clock['watermark'] <= change[1] < clock['now'])
+        changed = {change: row for change, row in changed.items() if change not in report['seen']}
+
+        if full or len(changed) > MAX_INCREMENTAL_LICENSES:
+            full = True
+            entries = {}
+            for col in DUPLICATE_KEY_COLUMNS:
+                entries.update(_query_groups(cursor, col))
+        elif changed:
+            entries = dict(entries)
+            _refresh_keys(cursor, entries, changed)
+
+        with _report_lock:
+            _report.update(entries=entries, watermark=clock['watermark'], seen=seen)
+            if full:
+                _report['built_at'] = time.monotonic()
+    except mysql.connector.Error as err:
+        print(f"ERROR: Database error in get_duplicate_report: {err}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+    return {
+        'success': True,
+        'cross_system': [entry for key, entry in entries.items() if key[0] == 'cross_system'],
+        'same_system_conflicts': [entry for key, entry in entries.items() if key[0] == 'same_system']
+    }
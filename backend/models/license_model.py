@@ -1,82 +1,162 @@
-from .db_connection import get_db_connection
+from .db_connection import get_db_connection, get_read_connection
+from .archive_model import license_archive_cutoff, reaches_archive, restore_archived_license
+from .records import License, select_columns
+from .query_builder import build_where, build_update, execute_prepared
+from services.search_index import license_search_index
+from services import ticket_journal
 import mysql.connector
 import json
 import uuid
-from datetime import datetime, date
+import threading
+import time
+from datetime import datetime
+
+# Per-system JSON path used as the "category" dimension in analytics
+ANALYTICS_CATEGORY_PATHS = {
+    'LSQ': '$.lsq.licenseType',
+    'DMS': '$.dms.dealerName',
+    'CRM': '$.crm.hubName',
+    'ZOHO': '$.zoho.role'
+}
+
+# Whitelisted group-by dimensions and the SQL expression each one maps to.
+# hub/city live under details_json.<lowercase system>, e.g. $.dms.hubName.
+ANALYTICS_DIMENSIONS = {
+    'status': "`status`",
+    'request_type': "`request_type`",
+    'hub': "JSON_UNQUOTE(JSON_EXTRACT(`details_json`, CONCAT('$.', LOWER(`system`), '.hubName')))",
+    'city': "JSON_UNQUOTE(JSON_EXTRACT(`details_json`, CONCAT('$.', LOWER(`system`), '.city')))",
+    'category': "JSON_UNQUOTE(JSON_EXTRACT(`details_json`, CASE `system` "
+                + " ".join(f"WHEN '{system}' THEN '{path}'" for system, path in ANALYTICS_CATEGORY_PATHS.items())
+                + " END))"
+}
+
+# Time bucket expressions over `assignment_date`
+ANALYTICS_BUCKETS = {
+    'day': "DATE_FORMAT(`assignment_date`, '%Y-%m-%d')",
+    'week': "DATE_FORMAT(`assignment_date`, '%x-W%v')",
+    'month': "DATE_FORMAT(`assignment_date`, '%Y-%m')",
+    'quarter': "CONCAT(YEAR(`assignment_date`), '-Q', QUARTER(`assignment_date`))"
+}
+
+# Listing filters in canonical order: (filter key, SQL condition, params for the value)
+LICENSE_FILTERS = (
+    ('system', "`system` = %s", lambda value: [value]),
+    ('status', "`status` = %s", lambda value: [value]),
+    ('query', "(`name` LIKE %s OR `email` LIKE %s OR `mobile` LIKE %s)", lambda value: [f"%{value}%"] * 3),
+    ('assignment_date_start', "`assignment_date` >= %s", lambda value: [value]),
+    ('assignment_date_end', "`assignment_date` <= %s", lambda value: [value])
+)
+
+# Updatable license fields in canonical order: (request key, column, value encoder)
+LICENSE_UPDATE_FIELDS = (
+    ('status', 'status', lambda value: value),
+    ('removal_details_json', 'removal_details_json', json.dumps),
+    ('attachmentData', 'attachment_data', lambda value: value),
+    ('details_json', 'details_json', json.dumps)
+)
+
+# How far back each typeahead index refresh looks before the previous one
+SEARCH_INDEX_OVERLAP_SECONDS = 60
+
+ANALYTICS_CACHE_TTL_SECONDS = 60
+ANALYTICS_CACHE_MAX_ENTRIES = 256
+
+_analytics_cache = {}
+_analytics_cache_lock = threading.Lock()
+
+def invalidate_analytics_cache():
+    """
+    Drops all cached analytics results. Called by every write to `licenses`.
+    """
+    with _analytics_cache_lock:
+        _analytics_cache.clear()
 
 def get_all_licenses(filters):
     """
     Retrieves licenses from the database, with optional filtering.
+    Returns a list of License records.
     """
     conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-
-        # Build dynamic WHERE clause based on query parameters
-        conditions = []
-        params = []
+        conn = get_read_connection()
 
-        if filters.get('system'):
-            conditions.append("`system` = %s")
-            params.append(filters['system'])
+        where_clause, params = build_where(LICENSE_FILTERS, filters)
 
-        if filters.get('status'):
-            conditions.append("`status` = %s")
-            params.append(filters['status'])
-
-        if filters.get('query'):
-            search_pattern = f"%{filters['query']}%"
-            conditions.append("(`name` LIKE %s OR `email` LIKE %s OR `mobile` LIKE %s)")
-            params.extend([search_pattern, search_pattern, search_pattern])
-
-        if filters.get('assignment_date_start'):
-            conditions.append("`assignment_date` >= %s")
-            params.append(filters['assignment_date_start'])
-
-        if filters.get('assignment_date_end'):
-            conditions.append("`assignment_date` <= %s")
-            params.append(filters['assignment_date_end'])
+        # Build the full query; archived rows are only read when the filters can match them
+        select_clause = f"SELECT {select_columns(License)}"
+        query = select_clause + " FROM `licenses`" + where_clause
 
-        # Build the full query
-        query = """
-        SELECT `id`, `ticket_id`, `system`, `name`, `mobile`, `email`, `request_type`,
-               `assignment_date`, `expiry_date`, `status`, `details_json`, `removal_details_json`,
-               `attachment_data`, `created_at`, `updated_at`, `requested_date`, `requestor_name`
-        FROM `licenses`
-        """
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
+        if (filters.get('status') in (None, '', 'Inactive')  # only Inactive licenses are archived
+                and reaches_archive(filters.get('assignment_date_start'), license_archive_cutoff())):
+            query += " UNION ALL " + select_clause + " FROM `licenses_archive`" + where_clause
+            params = params + params
         query += " ORDER BY `assignment_date` DESC"
 
         print(f"DEBUG: Executing licenses GET query: {query} with params: {params}")
 
-        cursor.execute(query, tuple(params))
-        licenses_data = cursor.fetchall()
-
-        # Parse JSON fields and format dates
-        for license in licenses_data:
-            for json_field in ['details_json', 'removal_details_json']:
-                if license.get(json_field):
-                    try:
-                        license[json_field] = json.loads(license[json_field])
-                    except json.JSONDecodeError:
-                        print(f"WARNING: Could not decode {json_field} for license ID {license.get('id')}: {license[json_field]}")
-                        license[json_field] = {}
-                else:
-                    license[json_field] = {}
-            
-            for date_field in ['assignment_date', 'expiry_date', 'created_at', 'updated_at', 'requested_date']:
-                if isinstance(license.get(date_field), (date, datetime)):
-                    license[date_field] = license[date_field].isoformat()
-                elif license.get(date_field) is None:
-                    license[date_field] = None
-
-        return licenses_data
+        cursor = execute_prepared(conn, query, params)
+        return [License.from_row(row) for row in cursor.fetchall()]
     except mysql.connector.Error as err:
         print(f"ERROR: Database error in get_licenses: {err}")
         raise
+    finally:
+        if conn:
+            conn.close()
+
+def get_license_search_rows(since=None):
+    """
+    Retrieves the fields indexed for typeahead search for every license,
+    archived ones included since listings still return them, or only for
+    licenses written since `since`. Returns (rows, as_of), where `as_of` is
+    the `since` to pass next time; it reaches back SEARCH_INDEX_OVERLAP_SECONDS
+    so writes whose transactions commit late are not missed.
+    """
+    conn = None
+    cursor = None
+    try:
+        # The primary, so the index never skips writes a replica has not applied yet
+        conn = get_read_connection(primary=True)
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT NOW() - INTERVAL %s SECOND AS as_of", (SEARCH_INDEX_OVERLAP_SECONDS,))
+        as_of = cursor.fetchone()['as_of']
+
+        columns = "`id`, `name`, `email`, `mobile`, `ticket_id`, `system`, `status`"
+        if since is None:
+            cursor.execute(f"SELECT {columns} FROM `licenses` UNION ALL SELECT {columns} FROM `licenses_archive`")
+        else:
+            cursor.execute(f"SELECT {columns} FROM `licenses` WHERE `updated_at` >= %s", (since,))
+        return cursor.fetchall(), as_of
+    except mysql.connector.Error as err:
+        print(f"ERROR: Database error in get_license_search_rows: {err}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+def search_licenses_by_prefix(query, limit):
+    """
+    Returns up to `limit` licenses whose name, email or mobile starts with
+    `query`, shaped like search index suggestions. Serves typeahead while the
+    in-memory index is still loading; prefix LIKEs can use the column indexes.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_read_connection()
+        cursor = conn.cursor(dictionary=True)
+        pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        cursor.execute(
+            "SELECT `id`, `name`, `email`, `mobile`, `ticket_id`, `system`, `status` FROM `licenses` "
+            "WHERE `name` LIKE %s OR `email` LIKE %s OR `mobile` LIKE %s LIMIT %s",
+            (pattern, pattern, pattern, limit)
+        )
+        return [{**row, 'score': 1.0} for row in cursor.fetchall()]
+    except mysql.connector.Error as err:
+        print(f"ERROR: Database error in search_licenses_by_prefix: {err}")
+        raise
     finally:
         if cursor:
             cursor.close()
@@ -85,19 +165,16 @@ def get_all_licenses(filters):
 
 def create_license(data):
     """
-    Adds a new license to the database.
+    Adds a new license to the database. Raises ValidationError if required
+    fields are missing from the request body or malformed.
     """
+    record = License.from_request(data)
     conn = None
     cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        license_id = str(uuid.uuid4())
-
-        details_json_str = json.dumps(data.get('details_json', {})) if data.get('details_json') else "{}"
-        
-        removal_details_json_str = None
-        attachment_data = data.get('attachmentData')
+        record.id = str(uuid.uuid4())
 
         insert_query = """
         INSERT INTO `licenses` (`id`, `ticket_id`, `system`, `name`, `mobile`, `email`, `request_type`,
@@ -106,27 +183,29 @@ def create_license(data):
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         """
         params = (
-            license_id,
-            data['ticketId'],
-            data['system'],
-            data['name'],
-            data.get('mobile') or None,
-            data.get('email') or None,
-            data.get('requestType', 'Add License'),
-            data['assignmentDate'],
-            data.get('expiryDate') or None,
-            data.get('status', 'Active'),
-            details_json_str,
-            removal_details_json_str,
-            attachment_data,
-            data['requestedDate'],
-            data['requestorName']
+            record.id,
+            record.ticket_id,
+            record.system,
+            record.name,
+            record.mobile,
+            record.email,
+            record.request_type,
+            record.assignment_date,
+            record.expiry_date,
+            record.status,
+            json.dumps(record.details_json) if record.details_json else "{}",
+            None,
+            record.attachment_data,
+            record.requested_date,
+            record.requestor_name
         )
         print(f"DEBUG: Executing add_license query: {insert_query} with params: {params}")
 
         cursor.execute(insert_query, params)
         conn.commit()
-        return license_id
+        invalidate_analytics_cache()
+        license_search_index.upsert(record.to_dict())
+        return record.id
     except mysql.connector.Error as err:
         print(f"ERROR: Database error in add_license: {err}")
         raise
@@ -140,57 +219,32 @@ def update_license(license_id, data):
     """
     Updates an existing license.
     """
+    update_query, params = build_update(
+        'licenses', LICENSE_UPDATE_FIELDS, data, 'id', license_id,
+        touch="`updated_at` = CURRENT_TIMESTAMP"
+    )
+    if update_query is None:
+        return False, 'No fields provided for update'
+
     conn = None
-    cursor = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-
-        new_status = data.get('status')
-        new_removal_details_json = data.get('removal_details_json')
-        new_attachment_data = data.get('attachmentData')
-
-        set_clauses = []
-        params = []
-
-        if new_status is not None:
-            set_clauses.append("`status` = %s")
-            params.append(new_status)
-        
-        if new_removal_details_json is not None:
-            set_clauses.append("`removal_details_json` = %s")
-            params.append(json.dumps(new_removal_details_json))
-        
-        if new_attachment_data is not None:
-            set_clauses.append("`attachment_data` = %s")
-            params.append(new_attachment_data)
-        
-        if 'details_json' in data and data['details_json'] is not None:
-            set_clauses.append("`details_json` = %s")
-            params.append(json.dumps(data['details_json']))
-
-        set_clauses.append("`updated_at` = CURRENT_TIMESTAMP")
-
-        if not set_clauses:
-            return False, 'No fields provided for update'
-
-        update_query = f"UPDATE `licenses` SET {', '.join(set_clauses)} WHERE `id` = %s"
-        params.append(license_id)
 
         print(f"DEBUG: Executing update_license query: {update_query} with params: {params}")
 
-        cursor.execute(update_query, tuple(params))
+        cursor = execute_prepared(conn, update_query, params)
         conn.commit()
+        invalidate_analytics_cache()
         
         if cursor.rowcount == 0:
             return False, 'License not found or no changes applied'
+        if data.get('status') is not None:
+            license_search_index.update_status(license_id, data['status'])
         return True, 'License updated successfully'
     except mysql.connector.Error as err:
         print(f"ERROR: Database error in update_license: {err}")
         raise
     finally:
-        if cursor:
-            cursor.close()
         if conn:
             conn.close()
 
@@ -219,24 +273,28 @@ def reactivate_license_db(license_id, reason, new_assignment_date, attachment_da
 
         cursor.execute(update_license_query, update_license_params)
         rows_affected = cursor.rowcount
+        if rows_affected == 0 and restore_archived_license(cursor, license_id):
+            cursor.execute(update_license_query, update_license_params)
+            rows_affected = cursor.rowcount
         conn.commit()
+        invalidate_analytics_cache()
 
         if rows_affected == 0:
             return False, 'License not found or already active'
+        license_search_index.update_status(license_id, 'Active')
 
         # Add ticket
         ticket_id = f"REACTIVATE-{uuid.uuid4().hex[:8].upper()}"
         action_description = f"Reactivate License for ID {license_id} (Reason: {reason}, New Assignment Date: {new_assignment_date})"
         notes = f"License reactivated by user input. Reason: {reason}"
-        add_ticket_query = """
-        INSERT INTO `tickets` (`ticket_id`, `action_description`, `status`, `timestamp`, `notes`)
-        VALUES (%s, %s, %s, %s, %s)
-        """
         ticket_timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         add_ticket_params = (ticket_id, action_description, 'Closed', ticket_timestamp, notes)
         
-        cursor.execute(add_ticket_query, add_ticket_params)
-        conn.commit()
+        if ticket_journal.is_enabled():
+            ticket_journal.append_ticket(add_ticket_params)
+        else:
+            cursor.execute(ticket_journal.TICKET_INSERT_QUERY, add_ticket_params)
+            conn.commit()
 
         return True, ticket_id
     except mysql.connector.Error as err:
@@ -253,11 +311,12 @@ def reactivate_license_db(license_id, reason, new_assignment_date, attachment_da
 def get_system_analytics(system_name, detail_json_field=None):
     """
     Generic function to retrieve system-specific license data for analytics.
+    Only Active licenses are counted, so `licenses_archive` (Inactive only) is not read.
     """
     conn = None
     cursor = None
     try:
-        conn = get_db_connection()
+        conn = get_read_connection()
         cursor = conn.cursor(dictionary=True)
 
         assignment_trend_query = """
@@ -298,3 +357,94 @@ def get_system_analytics(system_name, detail_json_field=None):
             cursor.close()
         if conn:
             conn.close()
+
+def get_multi_system_analytics(systems, group_by, bucket='month', start_date=None, end_date=None, status=None):
+    """
+    Retrieves license counts for several systems at once, grouped by time bucket
+    and any of the dimensions in ANALYTICS_DIMENSIONS, using a single query.
+    Results are keyed by system and cached until the next write or TTL expiry.
+    Unless grouping by status, only Active licenses are counted by default.
+    """
+    if status is None and 'status' not in group_by:
+        status = 'Active'
+
+    cache_key = (tuple(sorted(systems)), tuple(group_by), bucket, start_date, end_date, status)
+    now = time.monotonic()
+    with _analytics_cache_lock:
+        cached = _analytics_cache.get(cache_key)
+        if cached and now - cached[0] < ANALYTICS_CACHE_TTL_SECONDS:
+            return cached[1]
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_read_connection()
+        cursor = conn.cursor(dictionary=True)
+
+        select_parts = ["`system`", f"{ANALYTICS_BUCKETS[bucket]} AS period"]
+        group_parts = ["`system`", "period"]
+        for dimension in group_by:
+            select_parts.append(f"{ANALYTICS_DIMENSIONS[dimension]} AS `{dimension}`")
+            group_parts.append(f"`{dimension}`")
+        select_parts.append("COUNT(*) AS count")
+
+        conditions = ["`system` IN (" + ", ".join(["%s"] * len(systems)) + ")"]
+        params = list(systems)
+
+        if status:
+            conditions.append("`status` = %s")
+            params.append(status)
+
+        if start_date:
+            conditions.append("`assignment_date` >= %s")
+            params.append(start_date)
+
+        if end_date:
+            conditions.append("`assignment_date` <= %s")
+            params.append(end_date)
+
+        where_clause = ' AND '.join(conditions)
+        from_clause = f"FROM `licenses` WHERE {where_clause}"
+        if status in (None, 'Inactive') and reaches_archive(start_date, license_archive_cutoff()):
+            # Archived (Inactive) licenses still count towards their period
+            columns = "`system`, `status`, `request_type`, `assignment_date`, `details_json`"
+            from_clause = (f"FROM (SELECT {columns} FROM `licenses` WHERE {where_clause} "
+                           f"UNION ALL SELECT {columns} FROM `licenses_archive` WHERE {where_clause}) AS `all_licenses`")
+            params = params + params
+
+        query = f"""
+        SELECT {', '.join(select_parts)}
+        {from_clause}
+        GROUP BY {', '.join(group_parts)}
+        ORDER BY `system`, period ASC
+        """
+        print(f"DEBUG: Executing analytics query: {query} with params: {params}")
+
+        cursor.execute(query, tuple(params))
+
+        results = {system: [] for system in systems}
+        for row in cursor.fetchall():
+            system = row.pop('system')
+            results.setdefault(system, []).append(row)
+
+        data = {
+            'success': True,
+            'bucket': bucket,
+            'group_by': list(group_by),
+            'systems': results
+        }
+
+        with _analytics_cache_lock:
+            if len(_analytics_cache) >= ANALYTICS_CACHE_MAX_ENTRIES:
+                _analytics_cache.pop(next(iter(_analytics_cache)))
+            _analytics_cache[cache_key] = (now, data)
+
+        return data
+    except mysql.connector.Error as err:
+        print(f"ERROR: Database error in get_multi_system_analytics for {systems}: {err}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
@@ -0,0 +1,142 @@
+"""
+Shared SQL building and prepared-statement execution for the hot listing and
+update paths.
+
+Filters and SET assignments are always rendered in the order they are declared
+in a spec, so any combination of inputs maps to one canonical statement text.
+Statements are executed as server-side prepared statements and the prepared
+cursor is cached on the underlying connection, which pooled connections keep
+across requests, so repeated queries skip parsing on the server.
+"""
+import threading
+from collections import OrderedDict
+
+import mysql.connector
+from mysql.connector import errorcode
+
+# Prepared statements kept per connection before the least recently used is closed
+MAX_STATEMENTS_PER_CONNECTION = 64
+
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'reprepares': 0}
+_stats_lock = threading.Lock()
+
+
+def build_where(spec, filters):
+    """
+    Renders a WHERE clause from `spec`, a sequence of (filter_key, sql, param_fn)
+    tuples, including only filters with a truthy value. `param_fn` maps the
+    filter value to the list of parameters for its placeholders.
+    Returns (where_sql, params); where_sql is '' when no filter applies.
+    """
+    conditions = []
+    params = []
+    for key, sql, param_fn in spec:
+        value = filters.get(key)
+        if value:
+            conditions.append(sql)
+            params.extend(param_fn(value))
+    if not conditions:
+        return "", params
+    return " WHERE " + " AND ".join(conditions), params
+
+
+def build_update(table, spec, values, key_column, key_value, touch=None):
+    """
+    Renders an UPDATE from `spec`, a sequence of (value_key, column, encode_fn)
+    tuples, assigning only values that are not None. `touch` is an extra SET
+    fragment (e.g. "`updated_at` = CURRENT_TIMESTAMP") added only when at least
+    one column changes. Returns (sql, params), or (None, None) if nothing is set.
+    """
+    assignments = []
+    params = []
+    for key, column, encode_fn in spec:
+        value = values.get(key)
+        if value is not None:
+            assignments.append(f"`{column}` = %s")
+            params.append(encode_fn(value))
+    if not assignments:
+        return None, None
+    if touch:
+        assignments.append(touch)
+    params.append(key_value)
+    return f"UPDATE `{table}` SET {', '.join(assignments)} WHERE `{key_column}` = %s", params
+
+
+def _raw_connection(conn):
+    # Pooled connections wrap the real connection; prepared statements live on the latter
+    return getattr(conn, '_cnx', conn)
+
+
+def _statement_cache(conn):
+    """
+    Returns the prepared-statement cache of the connection's current server
+    session. The pool reconnects a dropped connection in place, which gives it
+    a new connection id and leaves the cached statement ids dangling, so the
+    cache is discarded whenever the id changes.
+    """
+    raw = _raw_connection(conn)
+    connection_id = raw.connection_id
+    cached = getattr(raw, '_prepared_statements', None)
+    if cached is None or cached[0] != connection_id:
+        # Stale cursors are dropped without close(): their statement ids may
+        # belong to unrelated statements in the new session
+        cached = (connection_id, OrderedDict())
+        raw._prepared_statements = cached
+    return cached[1]
+
+
+def _prepare(conn, cache, sql):
+    """Adds a new prepared cursor for `sql`, evicting the least recently used."""
+    cursor = conn.cursor(prepared=True)
+    cache[sql] = (sql, cursor)
+    evicted = None
+    if len(cache) > MAX_STATEMENTS_PER_CONNECTION:
+        _, (_, evicted) = cache.popitem(last=False)
+    with _stats_lock:
+        _stats['misses'] += 1
+        if evicted is not None:
+            _stats['evictions'] += 1
+    if evicted is not None:
+        evicted.close()  # deallocates the statement on the server
+    return sql, cursor
+
+
+def execute_prepared(conn, sql, params=()):
+    """
+    Executes `sql` as a server-side prepared statement, reusing the statement
+    already prepared on this connection when the text matches. Returns the
+    cursor, which is owned by the cache: read its results but do not close it.
+    """
+    cache = _statement_cache(conn)
+    cached = cache.get(sql)
+    if cached is not None:
+        # The driver only skips re-preparing when given the identical string object
+        sql, cursor = cached
+        cache.move_to_end(sql)
+        with _stats_lock:
+            _stats['hits'] += 1
+    else:
+        sql, cursor = _prepare(conn, cache, sql)
+
+    try:
+        cursor.execute(sql, tuple(params))
+    except mysql.connector.Error as err:
+        if cached is None or err.errno != errorcode.ER_UNKNOWN_STMT_HANDLER:
+            raise
+        # The server no longer knows the statement (e.g. it was restarted and the
+        # new session reused the connection id); prepare it again and retry once
+        del cache[sql]
+        with _stats_lock:
+            _stats['reprepares'] += 1
+        sql, cursor = _prepare(conn, cache, sql)
+        cursor.execute(sql, tuple(params))
+    return cursor
+
+
+def get_statement_cache_stats():
+    """Returns prepared-statement cache counters and the hit rate since startup."""
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / total, 4) if total else None
+    return stats
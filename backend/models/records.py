@@ -0,0 +1,199 @@
+"""
+Compact record types for rows of the `licenses`, `tickets` and `users` tables.
+
+Records use __slots__ instead of a per-row dict and are built straight from
+cursor tuples. Each type also declares how request bodies (camelCase JSON) map
+onto its columns and what each value must look like, so validation and key
+mapping live in one place.
+"""
+import json
+from datetime import datetime, date
+from operator import attrgetter
+
+
+# Format of ticket timestamps sent by the frontend (Date.prototype.toISOString)
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+class ValidationError(ValueError):
+    """Raised when a request body is missing required fields or has malformed values."""
+
+    def __init__(self, entity, missing=(), invalid=()):
+        self.missing = list(missing)
+        self.invalid = list(invalid)  # (json_key, expected description) pairs
+        problems = []
+        if self.missing:
+            problems.append(f'Missing required {entity} data: {", ".join(self.missing)}')
+        if self.invalid:
+            details = ", ".join(f"{key} must be {expected}" for key, expected in self.invalid)
+            problems.append(f'Invalid {entity} data: {details}')
+        super().__init__('; '.join(problems))
+
+
+def _is_text(value):
+    return isinstance(value, str)
+
+
+def _is_date(value):
+    try:
+        date.fromisoformat(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_timestamp(value):
+    try:
+        datetime.strptime(value, TIMESTAMP_FORMAT)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_object(value):
+    return isinstance(value, dict)
+
+
+# Value kinds used in REQUEST_FIELDS: kind -> (check, description for error messages)
+VALUE_KINDS = {
+    'text': (_is_text, 'a string'),
+    'date': (_is_date, 'a date (YYYY-MM-DD)'),
+    'timestamp': (_is_timestamp, 'an ISO timestamp (YYYY-MM-DDTHH:MM:SS.sssZ)'),
+    'object': (_is_object, 'an object')
+}
+
+
+def _decode_json(value):
+    if not value:
+        return {}
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        print(f"WARNING: Could not decode JSON column value: {value}")
+        return {}
+
+
+def _decode_date(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class _Record:
+    """Base class: subclasses set FIELDS, __slots__ = FIELDS and optional DECODERS."""
+    __slots__ = ()
+    FIELDS = ()
+    DECODERS = {}
+    ENTITY = 'record'
+    # (json_key, field, required, default, kind) tuples describing the request body;
+    # kind is a VALUE_KINDS key checked for every value that is not None
+    REQUEST_FIELDS = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._getter = attrgetter(*cls.FIELDS)
+        cls._required = tuple(key for key, _, required, _, _ in cls.REQUEST_FIELDS if required)
+
+    @classmethod
+    def from_row(cls, row):
+        """Builds a record from a cursor tuple whose columns follow FIELDS."""
+        record = cls.__new__(cls)
+        for field, value in zip(cls.FIELDS, row):
+            setattr(record, field, value)
+        for field, decode in cls.DECODERS.items():
+            setattr(record, field, decode(getattr(record, field)))
+        return record
+
+    @classmethod
+    def from_request(cls, data):
+        """
+        Validates a JSON request body and maps its camelCase keys onto columns.
+        Optional fields that are absent or empty take their declared default.
+        Raises ValidationError listing every missing or malformed field.
+        """
+        if not isinstance(data, dict):
+            raise ValidationError(cls.ENTITY, invalid=[('body', 'a JSON object')])
+        missing = [key for key in cls._required if key not in data]
+
+        record = cls.__new__(cls)
+        for field in cls.FIELDS:
+            setattr(record, field, None)
+        invalid = []
+        for key, field, required, default, kind in cls.REQUEST_FIELDS:
+            value = data.get(key) if required else (data.get(key) or default)
+            if (value is not None or (required and key in data)) and not VALUE_KINDS[kind][0](value):
+                invalid.append((key, VALUE_KINDS[kind][1]))
+            setattr(record, field, value)
+        if missing or invalid:
+            raise ValidationError(cls.ENTITY, missing, invalid)
+        return record
+
+    def to_row(self):
+        """Returns the record's values as a tuple ordered like FIELDS."""
+        return self._getter(self)
+
+    def to_dict(self):
+        return dict(zip(self.FIELDS, self._getter(self)))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class License(_Record):
+    FIELDS = (
+        'id', 'ticket_id', 'system', 'name', 'mobile', 'email', 'request_type',
+        'assignment_date', 'expiry_date', 'status', 'details_json', 'removal_details_json',
+        'attachment_data', 'created_at', 'updated_at', 'requested_date', 'requestor_name'
+    )
+    __slots__ = FIELDS
+    ENTITY = 'license'
+    DECODERS = {
+        'details_json': _decode_json,
+        'removal_details_json': _decode_json,
+        'assignment_date': _decode_date,
+        'expiry_date': _decode_date,
+        'created_at': _decode_date,
+        'updated_at': _decode_date,
+        'requested_date': _decode_date
+    }
+    REQUEST_FIELDS = (
+        ('ticketId', 'ticket_id', True, None, 'text'),
+        ('system', 'system', True, None, 'text'),
+        ('name', 'name', True, None, 'text'),
+        ('mobile', 'mobile', False, None, 'text'),
+        ('email', 'email', False, None, 'text'),
+        ('requestType', 'request_type', False, 'Add License', 'text'),
+        ('assignmentDate', 'assignment_date', True, None, 'date'),
+        ('expiryDate', 'expiry_date', False, None, 'date'),
+        ('status', 'status', False, 'Active', 'text'),
+        ('details_json', 'details_json', False, None, 'object'),
+        ('attachmentData', 'attachment_data', False, None, 'text'),
+        ('requestedDate', 'requested_date', True, None, 'date'),
+        ('requestorName', 'requestor_name', True, None, 'text')
+    )
+
+
+class Ticket(_Record):
+    FIELDS = ('ticket_id', 'action_description', 'timestamp', 'status', 'notes')
+    __slots__ = FIELDS
+    ENTITY = 'ticket'
+    DECODERS = {'timestamp': _decode_date}
+    REQUEST_FIELDS = (
+        ('ticketId', 'ticket_id', True, None, 'text'),
+        ('action', 'action_description', True, None, 'text'),
+        ('status', 'status', True, None, 'text'),
+        ('timestamp', 'timestamp', True, None, 'timestamp'),
+        ('notes', 'notes', False, None, 'text')
+    )
+
+
+class User(_Record):
+    FIELDS = ('id', 'username', 'password', 'created_at')
+    __slots__ = FIELDS
+    ENTITY = 'user'
+    DECODERS = {'created_at': _decode_date}
+
+
+def select_columns(record_type):
+    """Returns the backquoted column list for a SELECT matching `record_type.FIELDS`."""
+    return ", ".join(f"`{field}`" for field in record_type.FIELDS)
@@ -0,0 +1,122 @@
+from .db_connection import get_db_connection
+from .archive_model import restore_archived_license
+import mysql.connector
+import json
+import uuid
+from datetime import date
+
+def iter_licenses_for_sync(system_name, identifier_path):
+    """
+    Streams (id, status, sync_hash, email, mobile, identifier, archived) for every
+    license of a system, archived ones included, where identifier is the system's
+    own id at `identifier_path` in details_json, without buffering the result set
+    in memory.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()  # unbuffered: rows are fetched as they are consumed
+        columns = "`id`, `status`, `sync_hash`, `email`, `mobile`, JSON_UNQUOTE(JSON_EXTRACT(`details_json`, %s))"
+        query = f"""
+        SELECT {columns}, 0 FROM `licenses` WHERE `system` = %s
+        UNION ALL
+        SELECT {columns}, 1 FROM `licenses_archive` WHERE `system` = %s
+        """
+        identifier_path = identifier_path or '$.__none__'
+        cursor.execute(query, (identifier_path, system_name, identifier_path, system_name))
+        for *row, archived in cursor:
+            yield (*row, bool(archived))
+    except mysql.connector.Error as err:
+        print(f"ERROR: Database error in iter_licenses_for_sync for {system_name}: {err}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+def apply_sync_batch(system_name, inserts, deactivations, detail_updates):
+    """
+    Applies one batch of reconciliation changes in a single transaction.
+    `inserts` and `detail_updates` hold export rows (dicts with name, email,
+    mobile, details and sync_hash; updates also carry license_id), and
+    `deactivations` is a list of license ids missing from the export. Updates
+    keep name, mobile and email the export leaves empty, and reactivate an
+    Inactive license the way reactivate_license_db does, restoring it from
+    `licenses_archive` first when the row is marked archived.
+    """
+    if not (inserts or deactivations or detail_updates):
+        return
+    conn = None
+    cursor = None
+    today = date.today().isoformat()
+    sync_ticket_id = f"SYNC-{system_name}-{today}"
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        if inserts:
+            insert_query = """
+            INSERT INTO `licenses` (`id`, `ticket_id`, `system`, `name`, `mobile`, `email`, `request_type`,
+                                  `assignment_date`, `status`, `details_json`, `requested_date`,
+                                  `requestor_name`, `sync_hash`)
+            VALUES (%s, %s, %s, %s, %s, %s, 'Add License', %s, 'Active', %s, %s, 'Data Sync', %s)
+            """
+            cursor.executemany(insert_query, [
+                (str(uuid.uuid4()), sync_ticket_id, system_name, row['name'], row['mobile'], row['email'],
+                 today, json.dumps(row['details']), today, row['sync_hash'])
+                for row in inserts
+            ])
+
+        if deactivations:
+            removal_details = json.dumps({
+                'ticketId': sync_ticket_id,
+                'date': today,
+                'reason': f"Not present in {system_name} seat export",
+                'remover': 'Data Sync'
+            })
+            placeholders = ", ".join(["%s"] * len(deactivations))
+            cursor.execute(
+                f"UPDATE `licenses` SET `status` = 'Inactive', `removal_details_json` = %s, `sync_hash` = NULL "
+                f"WHERE `id` IN ({placeholders})",
+                (removal_details, *deactivations)
+            )
+
+        if detail_updates:
+            for row in detail_updates:
+                if row.get('archived'):
+                    restore_archived_license(cursor, row['license_id'])
+            # MySQL applies SET assignments left to right, so `status` is assigned
+            # last and the reactivation resets still see the license's old status
+            cursor.executemany(
+                """
+                UPDATE `licenses` SET
+                    `name` = COALESCE(NULLIF(%s, ''), `name`),
+                    `mobile` = COALESCE(%s, `mobile`),
+                    `email` = COALESCE(%s, `email`),
+                    `details_json` = %s,
+                    `assignment_date` = IF(`status` = 'Active', `assignment_date`, %s),
+                    `expiry_date` = IF(`status` = 'Active', `expiry_date`, NULL),
+                    `removal_details_json` = IF(`status` = 'Active', `removal_details_json`, NULL),
+                    `sync_hash` = %s,
+                    `updated_at` = CURRENT_TIMESTAMP,
+                    `status` = 'Active'
+                WHERE `id` = %s
+                """,
+                [(row['name'], row['mobile'], row['email'], json.dumps(row['details']), today,
+                  row['sync_hash'], row['license_id'])
+                 for row in detail_updates]
+            )
+
+        conn.commit()
+    except mysql.connector.Error as err:
+        if conn:
+            conn.rollback()
+        print(f"ERROR: Database error in apply_sync_batch for {system_name}: {err}")
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
@@ -1,26 +1,70 @@
-from .db_connection import get_db_connection
+from .db_connection import get_db_connection, get_read_connection
+from .archive_model import ticket_archive_cutoff, reaches_archive
+from .records import Ticket, TIMESTAMP_FORMAT, select_columns
+from .query_builder import build_update, execute_prepared
+from services import ticket_journal
 import mysql.connector
-from datetime import datetime, date
+from datetime import datetime
 
-def get_all_tickets():
+# Updatable ticket fields in canonical order: (request key, column, value encoder)
+TICKET_UPDATE_FIELDS = (
+    ('status', 'status', lambda value: value),
+    ('notes', 'notes', lambda value: value)
+)
+
+def get_all_tickets(filters=None):
     """
-    Retrieves all tickets from the database.
+    Retrieves tickets from the database as Ticket records. Archived tickets are
+    included unless `timestamp_start` is set after the archive cutoff.
+    With write-behind enabled, acknowledged tickets not yet committed by any
+    process are merged in, so no acknowledged ticket is ever missing.
     """
+    filters = filters or {}
+    write_behind = ticket_journal.is_enabled()
+    # Journals must be read before the snapshot is taken (see ticket_journal)
+    unflushed = ticket_journal.collect_unflushed() if write_behind else {}
     conn = None
     cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT `ticket_id`, `action_description`, `timestamp`, `status`, `notes` FROM `tickets` ORDER BY `timestamp` DESC")
-        tickets_data = cursor.fetchall()
+        # A lagging replica may not yet hold tickets whose journal another
+        # process already checkpointed and truncated, so read from the primary
+        conn = get_read_connection(primary=write_behind)
+        if unflushed:
+            conn.start_transaction(consistent_snapshot=True)
+        cursor = conn.cursor()
+
+        conditions = []
+        params = []
 
-        for ticket in tickets_data:
-            if isinstance(ticket.get('timestamp'), (date, datetime)):
-                ticket['timestamp'] = ticket['timestamp'].isoformat()
-            elif ticket.get('timestamp') is None:
-                ticket['timestamp'] = None
+        if filters.get('timestamp_start'):
+            conditions.append("`timestamp` >= %s")
+            params.append(filters['timestamp_start'])
 
-        return tickets_data
+        if filters.get('timestamp_end'):
+            conditions.append("`timestamp` <= %s")
+            params.append(filters['timestamp_end'])
+
+        select_clause = f"SELECT {select_columns(Ticket)}"
+        where_clause = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        query = select_clause + " FROM `tickets`" + where_clause
+
+        if reaches_archive(filters.get('timestamp_start'), ticket_archive_cutoff()):
+            query += " UNION ALL " + select_clause + " FROM `tickets_archive`" + where_clause
+            params = params + params
+        query += " ORDER BY `timestamp` DESC"
+
+        cursor.execute(query, tuple(params))
+        tickets = [Ticket.from_row(row) for row in cursor.fetchall()]
+
+        if unflushed:
+            start, end = filters.get('timestamp_start'), filters.get('timestamp_end')
+            for ticket_id, action, status, timestamp, notes in ticket_journal.filter_unflushed(cursor, unflushed):
+                timestamp = timestamp.replace(' ', 'T')
+                if (start and timestamp < start) or (end and timestamp > end):
+                    continue
+                tickets.append(Ticket.from_row((ticket_id, action, timestamp, status, notes)))
+            tickets.sort(key=lambda ticket: ticket.timestamp or '', reverse=True)
+        return tickets
     except mysql.connector.Error as err:
         print(f"ERROR: Database error in get_tickets: {err}")
         raise
@@ -32,26 +76,30 @@ def get_all_tickets():
 
 def create_ticket(data):
     """
-    Adds a new ticket entry to the database.
+    Adds a new ticket entry to the database. Raises ValidationError if required
+    fields are missing from the request body or malformed. With write-behind enabled the
+    ticket is journaled and committed later by the background flusher.
     """
+    record = Ticket.from_request(data)
+    params = (
+        record.ticket_id,
+        record.action_description,
+        record.status,
+        datetime.strptime(record.timestamp, TIMESTAMP_FORMAT).strftime('%Y-%m-%d %H:%M:%S'),
+        record.notes
+    )
+    if ticket_journal.is_enabled():
+        ticket_journal.append_ticket(params)
+        print(f"DEBUG: Journaled add_ticket for write-behind with params: {params}")
+        return
+
     conn = None
     cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
-        insert_query = """
-        INSERT INTO `tickets` (`ticket_id`, `action_description`, `status`, `timestamp`, `notes`)
-        VALUES (%s, %s, %s, %s, %s)
-        """
-        params = (
-            data['ticketId'],
-            data['action'],
-            data['status'],
-            datetime.strptime(data['timestamp'], '%Y-%m-%dT%H:%M:%S.%fZ').strftime('%Y-%m-%d %H:%M:%S'),
-            data.get('notes') or None
-        )
-        print(f"DEBUG: Executing add_ticket query: {insert_query} with params: {params}")
-        cursor.execute(insert_query, params)
+        print(f"DEBUG: Executing add_ticket query: {ticket_journal.TICKET_INSERT_QUERY} with params: {params}")
+        cursor.execute(ticket_journal.TICKET_INSERT_QUERY, params)
         conn.commit()
     except mysql.connector.Error as err:
         print(f"ERROR: Database error in add_ticket: {err}")
@@ -65,29 +113,20 @@ def create_ticket(data):
 def update_ticket(ticket_id, data):
     """
     Updates the status and optionally notes of a specific ticket.
+    Returns False if the ticket does not exist or no fields were provided.
     """
+    update_query, params = build_update(
+        'tickets', TICKET_UPDATE_FIELDS, {'status': data.get('status') or None, 'notes': data.get('notes')},
+        'ticket_id', ticket_id
+    )
+    if update_query is None:
+        print(f"DEBUG: No fields provided to update ticket {ticket_id}")
+        return False
+
     conn = None
-    cursor = None
     try:
         conn = get_db_connection()
-        cursor = conn.cursor()
-
-        new_status = data.get('status')
-        new_notes = data.get('notes')
-
-        set_clauses = []
-        params = []
-        if new_status:
-            set_clauses.append("`status` = %s")
-            params.append(new_status)
-        if new_notes is not None:
-            set_clauses.append("`notes` = %s")
-            params.append(new_notes)
-        
-        update_query = f"UPDATE `tickets` SET {', '.join(set_clauses)} WHERE `ticket_id` = %s"
-        params.append(ticket_id)
-
-        cursor.execute(update_query, tuple(params))
+        cursor = execute_prepared(conn, update_query, params)
         conn.commit()
         
         if cursor.rowcount == 0:
@@ -97,7 +136,5 @@ def update_ticket(ticket_id, data):
         print(f"ERROR: Database error in update_ticket_status: {err}")
         raise
     finally:
-        if cursor:
-            cursor.close()
         if conn:
             conn.close()
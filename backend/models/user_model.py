@@ -1,19 +1,20 @@
-from .db_connection import get_db_connection
+from .db_connection import get_read_connection
+from .records import User, select_columns
 import mysql.connector
 
 def get_user_by_credentials(username, password):
     """
-    Retrieves a user by username and password.
+    Retrieves a user by username and password, or None if there is no match.
     """
     conn = None
     cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT * FROM `users` WHERE `username` = %s AND `password` = %s"
+        conn = get_read_connection()
+        cursor = conn.cursor()
+        query = f"SELECT {select_columns(User)} FROM `users` WHERE `username` = %s AND `password` = %s"
         cursor.execute(query, (username, password))
-        user = cursor.fetchone()
-        return user
+        row = cursor.fetchone()
+        return User.from_row(row) if row else None
     except mysql.connector.Error as err:
         print(f"ERROR: Database error during login: {err}")
         raise
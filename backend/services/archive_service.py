@@ -0,0 +1,17 @@
+"""
+Archival job that moves cold rows out of the hot `licenses` and `tickets` tables.
+
+Run periodically (e.g. nightly cron) from the backend directory:
+    python -m services.archive_service
+"""
+from models.archive_model import archive_inactive_licenses, archive_closed_tickets
+
+def run_archival(batch_size=1000):
+    """Archives inactive licenses and closed tickets past their retention windows."""
+    licenses_archived = archive_inactive_licenses(batch_size)
+    tickets_archived = archive_closed_tickets(batch_size)
+    print(f"INFO: Archival complete: {licenses_archived} licenses, {tickets_archived} tickets moved")
+    return {'licenses': licenses_archived, 'tickets': tickets_archived}
+
+if __name__ == '__main__':
+    run_archival()
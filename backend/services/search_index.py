@@ -0,0 +1,435 @@
+"""
+In-process trigram index used for license typeahead suggestions.
+
+Each license is indexed on name, email, mobile and ticket_id, and each field of
+a candidate is scored on its own: by the share of the query's trigrams it
+contains, which tolerates typos without a round trip to MySQL, with exact and
+prefix matches, then shorter values, winning ties. Exact and prefix matches are
+found directly from per-field arrays of documents sorted by value; other
+candidates come from the trigram postings. Work per query is bounded by a fixed
+number of documents scored.
+
+Memory is kept to a byte budget. Postings and the sorted per-field arrays are
+arrays of 32-bit document slots, and each document is a single summary string;
+a document's trigrams are recomputed from its summary when it is removed rather
+than kept around.
+
+Each process keeps its own copy, so the budget applies per gunicorn worker. It
+is kept in step with writes from any process (other workers, the sync job) by
+upserting licenses written since the last refresh, and by a periodic full pass
+in the background that updates the index in place.
+"""
+import heapq
+import itertools
+import math
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+SEARCH_FIELDS = ('name', 'email', 'mobile', 'ticket_id')
+# Separates the fields of a document's summary string
+_SEPARATOR = '\x1f'
+
+# Default memory budget for one process's index; documents past it are evicted
+MAX_INDEX_BYTES = 128 * 1024 * 1024
+# Estimated cost of one posting or sorted-array entry, and of a document beyond
+# its summary string and those entries (its slot and document map entries)
+_SLOT_ENTRY_BYTES = 4
+_DOCUMENT_OVERHEAD_BYTES = 200
+MAX_FIELD_LENGTH = 64
+# Most documents scored per query, which bounds latency when nothing matches well
+CANDIDATE_BUDGET = 150
+# Postings longer than this are not intersected when looking for documents that
+# contain every query trigram; they are only sampled
+INTERSECT_LIMIT = 5000
+# Rows applied per lock acquisition while (re)building, so searches keep flowing
+BUILD_BATCH_SIZE = 2000
+
+# Licenses written by any process are picked up at most this long after the write
+REFRESH_INTERVAL_SECONDS = 5
+# Full pass interval, which also drops documents no longer in the database
+FULL_REBUILD_SECONDS = 600
+
+
+def _trigrams(text, closed=True):
+    """
+    Returns the set of padded, lowercased trigrams of `text`. Queries are left
+    open at the end (closed=False) so a prefix matches the values it starts.
+    """
+    text = f"  {text.lower()[:MAX_FIELD_LENGTH]}{' ' if closed else ''}"
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _summary(row):
+    """
+    Packs a row into one string: each search field padded the way _trigrams
+    pads it (or '' when missing), then system and status.
+    """
+    fields = []
+    for field in SEARCH_FIELDS:
+        value = row.get(field)
+        fields.append(f"  {str(value)[:MAX_FIELD_LENGTH]} " if value not in (None, '') else '')
+    fields.append(row.get('system') or '')
+    fields.append(row.get('status') or '')
+    return _SEPARATOR.join(fields)
+
+
+def _summary_trigrams(summary):
+    """Returns the trigrams of a summary's search fields."""
+    text = summary.rsplit(_SEPARATOR, 2)[0].lower()
+    return {gram for gram in (text[i:i + 3] for i in range(len(text) - 2)) if _SEPARATOR not in gram}
+
+
+def _contains(posting, slot):
+    i = bisect_left(posting, slot)
+    return i < len(posting) and posting[i] == slot
+
+
+def _field_value(summary, field):
+    """Returns the lowercased value of search field number `field` in a summary."""
+    return summary.split(_SEPARATOR, field + 1)[field][2:-1].lower()
+
+
+class TrigramIndex:
+    """Thread-safe trigram index of license search fields keyed by license id."""
+
+    def __init__(self, max_bytes=MAX_INDEX_BYTES):
+        self.max_bytes = max_bytes
+        self.ready = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._postings = {}   # trigram -> array of document slots, ascending
+        self._orders = tuple(array('i') for _ in SEARCH_FIELDS)  # per field: slots by (value, slot)
+        self._documents = {}  # slot -> summary string
+        self._ids = {}        # slot -> license_id
+        self._slots = {}      # license_id -> slot
+        self._inactive = {}   # slots of Inactive documents, oldest first; evicted first
+        self._next_slot = 0
+        self._bytes = 0       # estimated size of the contents
+        self._bulk = False    # while loading an empty index, the orders are sorted at the end
+        self._warned_full = False
+        self._as_of = None    # database time the next incremental refresh starts from
+        self._built_at = 0.0
+        self._refreshed_at = 0.0
+
+    def build(self, rows, as_of=None):
+        """
+        Brings the index in line with `rows` (dicts with id, SEARCH_FIELDS,
+        system and status for every license), in batches and in place: unchanged
+        documents are kept, changed ones replaced and missing ones dropped.
+        `as_of` is the database time incremental refreshes continue from.
+        """
+        present = set()
+        rows = iter(rows)
+        with self._lock:
+            self._bulk = not self._documents
+        try:
+            while True:
+                batch = list(itertools.islice(rows, BUILD_BATCH_SIZE))
+                if not batch:
+                    break
+                with self._lock:
+                    for row in batch:
+                        present.add(row['id'])
+                        self._upsert(row)
+            with self._lock:
+                for license_id in [license_id for license_id in self._slots if license_id not in present]:
+                    self._remove(license_id)
+                if self._bulk:
+                    self._sort_orders()
+                self._as_of = as_of
+                self._built_at = self._refreshed_at = time.monotonic()
+                self.ready = True
+        finally:
+            if self._bulk:
+                with self._lock:
+                    self._sort_orders()
+        print(f"INFO: License search index built with {len(self._documents)} documents "
+              f"(~{self._bytes // (1024 * 1024)} MiB)")
+
+    def upsert(self, row):
+        """Adds or refreshes a single license after a write."""
+        with self._lock:
+            self._upsert(row)
+
+    def remove(self, license_id):
+        """Drops a license from the index."""
+        with self._lock:
+            self._remove(license_id)
+
+    def update_status(self, license_id, status):
+        """Updates the cached status of an indexed license without re-tokenizing it."""
+        with self._lock:
+            slot = self._slots.get(license_id)
+            if slot is None:
+                return
+            summary = self._documents[slot]
+            updated = summary.rsplit(_SEPARATOR, 1)[0] + _SEPARATOR + (status or '')
+            self._documents[slot] = updated
+            self._bytes += sys.getsizeof(updated) - sys.getsizeof(summary)
+            if status == 'Inactive':
+                self._inactive.setdefault(slot)
+            else:
+                self._inactive.pop(slot, None)
+
+    def refresh_if_due(self, load_rows):
+        """
+        Keeps the index in step with the database. `load_rows(since=None)`
+        returns (rows, as_of) for every license, or only for those written
+        since `since`. Upserts recently written licenses every
+        REFRESH_INTERVAL_SECONDS, and runs a full pass in a background thread
+        on first use and every FULL_REBUILD_SECONDS after that (retrying a
+        failed first build sooner). Refresh errors are logged and the current
+        contents keep being served; callers check `ready` before searching.
+        """
+        now = time.monotonic()
+        due = FULL_REBUILD_SECONDS if self.ready else REFRESH_INTERVAL_SECONDS
+        if now - self._built_at > due:
+            if self._refresh_lock.acquire(blocking=False):
+                self._built_at = now  # one attempt per interval, even if it fails
+                threading.Thread(target=self._rebuild, args=(load_rows,),
+                                 name='search-index-rebuild', daemon=True).start()
+        elif self.ready and now - self._refreshed_at > REFRESH_INTERVAL_SECONDS:
+            if self._refresh_lock.acquire(blocking=False):
+                try:
+                    self._refreshed_at = now
+                    rows, as_of = load_rows(self._as_of)
+                    with self._lock:
+                        for row in rows:
+                            self._upsert(row)
+                    self._as_of = as_of
+                except Exception as e:
+                    print(f"WARNING: Could not refresh license search index: {e}")
+                finally:
+                    self._refresh_lock.release()
+
+    def _rebuild(self, load_rows):
+        try:
+            self.build(*load_rows())
+        except Exception as e:
+            print(f"WARNING: Could not rebuild license search index: {e}")
+        finally:
+            self._refresh_lock.release()
+
+    def _upsert(self, row):
+        summary = _summary(row)
+        slot = self._slots.get(row['id'])
+        if slot is not None:
+            if self._documents[slot] == summary:
+                return
+            self._remove(row['id'])
+        self._add(row['id'], summary)
+
+    def _cost(self, summary, grams):
+        fields = sum(1 for value in summary.split(_SEPARATOR)[:len(SEARCH_FIELDS)] if value)
+        return sys.getsizeof(summary) + _SLOT_ENTRY_BYTES * (len(grams) + fields) + _DOCUMENT_OVERHEAD_BYTES
+
+    def _add(self, license_id, summary):
+        grams = _summary_trigrams(summary)
+        cost = self._cost(summary, grams)
+        while self._documents and self._bytes + cost > self.max_bytes:
+            # Evict the least recently written Inactive license, or failing that
+            # the least recently written one, so memory stays within budget
+            if not self._inactive and not self._warned_full:
+                self._warned_full = True
+                print(f"WARNING: License search index is full ({self.max_bytes // (1024 * 1024)} MiB, "
+                      f"{len(self._documents)} documents); evicting Active licenses, "
+                      "which will be missing from suggestions")
+            victim = next(iter(self._inactive)) if self._inactive else next(iter(self._documents))
+            self._remove(self._ids[victim])
+
+        # Slots only grow, so appending keeps every posting sorted
+        slot = self._next_slot
+        self._next_slot += 1
+        self._documents[slot] = summary
+        self._ids[slot] = license_id
+        self._slots[license_id] = slot
+        self._bytes += cost
+        if summary.endswith(_SEPARATOR + 'Inactive'):
+            self._inactive[slot] = None
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                posting = self._postings[sys.intern(gram)] = array('i')
+            posting.append(slot)
+        for field, order in enumerate(self._orders):
+            value = _field_value(summary, field)
+            if value:
+                if self._bulk:
+                    order.append(slot)
+                else:
+                    order.insert(self._bisect_order(field, value, slot), slot)
+
+    def _remove(self, license_id):
+        slot = self._slots.pop(license_id, None)
+        if slot is None:
+            return
+        summary = self._documents[slot]
+        grams = _summary_trigrams(summary)
+        self._bytes -= self._cost(summary, grams)
+        for field, order in enumerate(self._orders):
+            value = _field_value(summary, field)
+            if value:
+                if self._bulk:
+                    order.remove(slot)
+                else:
+                    i = self._bisect_order(field, value, slot)
+                    if i < len(order) and order[i] == slot:
+                        del order[i]
+        del self._documents[slot]
+        del self._ids[slot]
+        self._inactive.pop(slot, None)
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            i = bisect_left(posting, slot)
+            if i < len(posting) and posting[i] == slot:
+                del posting[i]
+                if not posting:
+                    del self._postings[gram]
+
+    def _bisect_order(self, field, value, slot=-1):
+        """Returns the position of (value, slot) in the field's sorted array."""
+        order = self._orders[field]
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = order[mid]
+            if (_field_value(self._documents[other], field), other) < (value, slot):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _sort_orders(self):
+        self._bulk = False
+        for field, order in enumerate(self._orders):
+            keyed = sorted((_field_value(self._documents[slot], field), slot) for slot in order)
+            order[:] = array('i', (slot for _, slot in keyed))
+
+    @staticmethod
+    def _score(lowered, query, query_grams):
+        """
+        Returns the best (shared trigrams, exact, prefix, -length) over the
+        search fields of a lowercased summary, each field scored on its own.
+        """
+        best = (0, False, False, 0)
+        for padded in lowered.split(_SEPARATOR, len(SEARCH_FIELDS))[:len(SEARCH_FIELDS)]:
+            if not padded:
+                continue
+            shared = sum(map(padded.__contains__, query_grams))
+            if shared >= best[0]:
+                value = padded[2:-1]
+                key = (shared, value == query, value.startswith(query), -len(value))
+                if key > best:
+                    best = key
+        return best
+
+    def _candidates(self, query, query_grams, limit, min_shared):
+        """
+        Yields (best score a document not yet yielded can have, slot), most
+        promising first: documents with a field starting with the query, then
+        documents containing every query trigram (from intersecting the short
+        postings), then the newest documents of each posting in turn, rarest
+        posting first. Trigram candidates are skipped when too few of the
+        query's trigrams are indexed for any document to share `min_shared`.
+        """
+        bound = (len(query_grams), True, True, -len(query))  # an exact match
+        for field, order in enumerate(self._orders):
+            i = self._bisect_order(field, query)
+            for slot in order[i:i + limit]:
+                if not _field_value(self._documents[slot], field).startswith(query):
+                    break
+                yield bound, slot
+
+        # Prefix matches are found above, within the first `limit` of each field
+        bound = (len(query_grams), False, False, 0)
+        postings = sorted((self._postings[gram] for gram in query_grams if gram in self._postings), key=len)
+        if len(postings) < min_shared:
+            return
+        if len(postings) > 1 and len(postings[1]) <= INTERSECT_LIMIT:
+            common = set(postings[0]).intersection(postings[1])
+            for posting in postings[2:]:
+                if len(posting) > INTERSECT_LIMIT:
+                    break
+                if len(common) * 16 < len(posting):
+                    narrowed = {slot for slot in common if _contains(posting, slot)}
+                else:
+                    narrowed = common.intersection(posting)
+                if narrowed:
+                    common = narrowed  # a typo's trigram would empty it; skip that one
+            for slot in sorted(common, reverse=True):
+                yield bound, slot
+
+        for slots in itertools.zip_longest(*(reversed(posting) for posting in postings)):
+            for slot in slots:
+                if slot is not None:
+                    yield bound, slot
+
+    def _rank(self, query, query_grams, limit, min_shared):
+        """
+        Returns [(score, slot)] for the `limit` best of at most CANDIDATE_BUDGET
+        documents, leaving out those sharing fewer than `min_shared` trigrams.
+        """
+        best = []  # min-heap of (score, slot)
+        seen = set()
+        for bound, slot in self._candidates(query, query_grams, limit, min_shared):
+            if len(best) == limit and best[0][0] >= bound or len(seen) >= CANDIDATE_BUDGET:
+                break
+            if slot in seen:
+                continue
+            seen.add(slot)
+            summary = self._documents[slot]
+            # Trigrams found anywhere in the document bound its score cheaply. Once
+            # the results are full, only exact and prefix matches (found above) or
+            # more shared trigrams can displace one, so ties are not worth scoring
+            lowered = summary.lower()
+            needed = best[0][0][0] + 1 if len(best) == limit else min_shared
+            if sum(map(lowered.__contains__, query_grams)) < needed:
+                continue
+            entry = (self._score(lowered, query, query_grams), slot)
+            if entry[0][0] < min_shared:
+                continue
+            if len(best) < limit:
+                heapq.heappush(best, entry)
+            elif entry > best[0]:
+                heapq.heapreplace(best, entry)
+        return sorted(best, reverse=True)
+
+    def suggest(self, query, limit=10, min_similarity=0.3):
+        """
+        Returns up to `limit` licenses ranked by trigram similarity to `query`.
+        Similarity is the share of the query's trigrams found in the document's
+        best matching field.
+        """
+        query = query.strip().lower()[:MAX_FIELD_LENGTH]
+        if not query:
+            return []
+        query_grams = tuple(_trigrams(query, closed=False))
+
+        with self._lock:
+            results = []
+            min_shared = math.ceil(min_similarity * len(query_grams))
+            for score, slot in self._rank(query, query_grams, limit, min_shared):
+                similarity = score[0] / len(query_grams)
+                summary = self._documents[slot]
+                name, email, mobile, ticket_id, system, status = (
+                    value.strip() or None for value in summary.split(_SEPARATOR)
+                )
+                results.append({
+                    'id': self._ids[slot],
+                    'name': name,
+                    'email': email,
+                    'mobile': mobile,
+                    'ticket_id': ticket_id,
+                    'system': system,
+                    'status': status,
+                    'score': round(similarity, 3)
+                })
+            return results
+
+
+license_search_index = TrigramIndex()
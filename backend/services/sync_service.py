@@ -0,0 +1,337 @@
+"""
+Reconciles `licenses` against an external system's seat export (DMS, LSQ, CRM, ZOHO).
+
+Export rows and licenses are matched on email, then mobile, then the system's own
+identifier: rows left unpaired on one key are tried on the next, so a license
+stored with only a mobile still matches an export row carrying an email too.
+Active licenses are matched first and Inactive ones only for the rows still
+unpaired, so an old license is never reactivated in place of a current one;
+archived licenses take part as Inactive ones and are restored when matched.
+Each pass sorts both sides by its key on disk in bounded runs and merge-joins
+them, so neither side is ever fully held in memory. Rows whose content hash
+matches the stored `sync_hash` are skipped, which makes repeated runs incremental.
+
+Run from the backend directory:
+    python -m services.sync_service DMS /path/to/dms_export.csv
+"""
+import csv
+import hashlib
+import heapq
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+
+from models.sync_model import iter_licenses_for_sync, apply_sync_batch
+
+SYNC_LOG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data_sync_log.txt')
+
+# Export columns that map onto license columns; everything else goes into details_json
+BASE_COLUMNS = ('name', 'email', 'mobile')
+
+# Per-system identifier used as the last-resort match key: (details_json path, export column)
+SYSTEM_IDENTIFIERS = {
+    'DMS': (None, None),
+    'LSQ': ('$.lsq.mobileNumber', 'mobileNumber'),
+    'CRM': (None, None),
+    'ZOHO': ('$.zoho.emailAddress', 'emailAddress')
+}
+
+# Keys tried in turn when pairing export rows with licenses
+MATCH_KEYS = ('email', 'mobile', 'identifier')
+
+SORT_RUN_SIZE = 100000
+WRITE_BATCH_SIZE = 1000
+
+
+def _read_export(path):
+    """Yields export rows as dicts, streaming CSV or JSONL based on the file extension."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _match_key(value):
+    """Normalizes an email, mobile or identifier the same way for both sides."""
+    if value is None:
+        return None
+    return str(value).strip().lower() or None
+
+
+def _normalize(system_name, raw):
+    """
+    Converts a raw export row into a row holding the license columns, the
+    system-specific details, a content hash and its match keys. Returns None
+    when the row has no usable key.
+    """
+    _, identifier_column = SYSTEM_IDENTIFIERS.get(system_name, (None, None))
+    name = (raw.get('name') or '').strip()
+    email = (raw.get('email') or '').strip(' ') or None
+    mobile = (raw.get('mobile') or '').strip(' ') or None
+
+    details = raw.get('details')
+    if not isinstance(details, dict):
+        details = {k: v for k, v in raw.items() if k not in BASE_COLUMNS and v not in (None, '')}
+
+    keys = {
+        'email': _match_key(email),
+        'mobile': _match_key(mobile),
+        'identifier': _match_key(details.get(identifier_column) if identifier_column else None)
+    }
+    if not any(keys.values()):
+        return None
+
+    row = {
+        'name': name,
+        'email': email,
+        'mobile': mobile,
+        'details': {system_name.lower(): details}
+    }
+    row['sync_hash'] = hashlib.sha1(json.dumps(row, sort_keys=True).encode('utf-8')).hexdigest()
+    row['keys'] = keys
+    return row
+
+
+def _export_rows(system_name, path, stats):
+    """Streams the normalized rows of an export, counting those without a usable key."""
+    for raw in _read_export(path):
+        stats['export_rows'] += 1
+        row = _normalize(system_name, raw)
+        if row is None:
+            stats['skipped_no_key'] += 1
+            continue
+        yield row
+
+
+def _license_rows(system_name, identifier_path):
+    """Streams a system's licenses, archived ones included, with the same match keys as export rows."""
+    for license_id, status, sync_hash, email, mobile, identifier, archived in iter_licenses_for_sync(system_name, identifier_path):
+        yield {
+            'license_id': license_id,
+            'status': status,
+            'sync_hash': sync_hash,
+            'archived': archived,
+            'keys': {'email': _match_key(email), 'mobile': _match_key(mobile), 'identifier': _match_key(identifier)}
+        }
+
+
+class _Spill:
+    """Append-only JSONL file of rows carried over to a later matching pass."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+
+    def write(self, item):
+        self._file.write(json.dumps(item) + '\n')
+
+    def read(self):
+        """Closes the file for writing and streams its rows back."""
+        self._file.close()
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def _sorted_by_key(items, run_dir, name):
+    """
+    Yields (key, item) pairs sorted by key using on-disk sorted runs of at most
+    SORT_RUN_SIZE pairs merged with heapq.merge, keeping memory bounded.
+    """
+    run_paths = []
+    buffer = []
+
+    def flush_run():
+        buffer.sort(key=itemgetter(0))
+        run_path = os.path.join(run_dir, f"{name}_run_{len(run_paths)}.jsonl")
+        with open(run_path, 'w', encoding='utf-8') as f:
+            for item in buffer:
+                f.write(json.dumps(item) + '\n')
+        run_paths.append(run_path)
+        buffer.clear()
+
+    for item in items:
+        buffer.append(item)
+        if len(buffer) >= SORT_RUN_SIZE:
+            flush_run()
+    if buffer:
+        flush_run()
+
+    def read_run(run_path):
+        with open(run_path, encoding='utf-8') as f:
+            for line in f:
+                key, item = json.loads(line)
+                yield key, item
+
+    yield from heapq.merge(*(read_run(p) for p in run_paths), key=itemgetter(0))
+
+
+class _SyncBatch:
+    """Accumulates reconciliation changes and applies them in batched transactions."""
+
+    def __init__(self, system_name, stats, dry_run=False):
+        self.system_name = system_name
+        self.stats = stats
+        self.dry_run = dry_run
+        self.inserts = []
+        self.deactivations = []
+        self.detail_updates = []
+
+    def add(self, kind, item):
+        getattr(self, kind).append(item)
+        self.stats[kind] += 1
+        if len(self.inserts) + len(self.deactivations) + len(self.detail_updates) >= WRITE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.dry_run:
+            apply_sync_batch(self.system_name, self.inserts, self.deactivations, self.detail_updates)
+        self.inserts, self.deactivations, self.detail_updates = [], [], []
+
+
+def _pair_group(batch, licenses, export_rows):
+    """
+    Pairs licenses and export rows sharing a key. Active licenses whose
+    sync_hash matches an export row pair first and are left unchanged; the
+    rest pair in order and are updated (reactivating Inactive ones). Returns
+    the export rows and licenses left unpaired.
+    """
+    unchanged = {}  # sync_hash -> Active licenses carrying it
+    remaining = []
+    for license in licenses:
+        if license['status'] == 'Active' and license['sync_hash']:
+            unchanged.setdefault(license['sync_hash'], []).append(license)
+        else:
+            remaining.append(license)
+
+    pending = []
+    for row in export_rows:
+        matches = unchanged.get(row['sync_hash'])
+        if matches:
+            matches.pop()
+            batch.stats['unchanged'] += 1
+        else:
+            pending.append(row)
+
+    remaining.extend(license for matches in unchanged.values() for license in matches)
+    for row, license in zip(pending, remaining):
+        if license['status'] != 'Active':
+            batch.stats['reactivations'] += 1
+        batch.add('detail_updates', dict(row, license_id=license['license_id'], archived=license['archived']))
+    return pending[len(remaining):], remaining[len(pending):]
+
+
+def _match_on_key(batch, key_name, export_rows, licenses, run_dir, name):
+    """
+    Pairs export rows and licenses on one key. Returns iterators over the export
+    rows and licenses left unpaired, including those without that key.
+    """
+    export_left = _Spill(os.path.join(run_dir, f"{name}_export_left.jsonl"))
+    licenses_left = _Spill(os.path.join(run_dir, f"{name}_licenses_left.jsonl"))
+
+    def keyed(items, spill):
+        for item in items:
+            key = item['keys'].get(key_name)
+            if key:
+                yield key, item
+            else:
+                spill.write(item)
+
+    export_groups = groupby(_sorted_by_key(keyed(export_rows, export_left), run_dir, f"{name}_export"), key=itemgetter(0))
+    license_groups = groupby(_sorted_by_key(keyed(licenses, licenses_left), run_dir, f"{name}_licenses"), key=itemgetter(0))
+
+    export_key, export_group = _next_group(export_groups)
+    license_key, license_group = _next_group(license_groups)
+    while export_key is not None or license_key is not None:
+        if license_key is None or (export_key is not None and export_key < license_key):
+            unpaired_rows, unpaired_licenses = export_group, []
+            export_key, export_group = _next_group(export_groups)
+        elif export_key is None or license_key < export_key:
+            unpaired_rows, unpaired_licenses = [], license_group
+            license_key, license_group = _next_group(license_groups)
+        else:
+            unpaired_rows, unpaired_licenses = _pair_group(batch, license_group, export_group)
+            export_key, export_group = _next_group(export_groups)
+            license_key, license_group = _next_group(license_groups)
+        for row in unpaired_rows:
+            export_left.write(row)
+        for license in unpaired_licenses:
+            licenses_left.write(license)
+
+    return export_left.read(), licenses_left.read()
+
+
+def _match(batch, export_rows, licenses, run_dir, name):
+    """Runs one pass per MATCH_KEYS key; returns the export rows and licenses left unpaired."""
+    for key_name in MATCH_KEYS:
+        export_rows, licenses = _match_on_key(batch, key_name, export_rows, licenses, run_dir, f"{name}_{key_name}")
+    return export_rows, licenses
+
+
+def reconcile_system(system_name, export_path, dry_run=False):
+    """
+    Reconciles one system's licenses with its seat export and appends a JSON
+    summary line to the sync log. Returns the summary dict.
+    """
+    system_name = system_name.upper()
+    identifier_path, _ = SYSTEM_IDENTIFIERS.get(system_name, (None, None))
+    stats = {
+        'export_rows': 0, 'skipped_no_key': 0, 'unchanged': 0,
+        'inserts': 0, 'deactivations': 0, 'detail_updates': 0, 'reactivations': 0
+    }
+    started = time.monotonic()
+    batch = _SyncBatch(system_name, stats, dry_run)
+
+    with tempfile.TemporaryDirectory(prefix='license_sync_') as run_dir:
+        inactive = _Spill(os.path.join(run_dir, 'inactive.jsonl'))
+
+        def active_licenses():
+            for license in _license_rows(system_name, identifier_path):
+                if license['status'] == 'Active':
+                    yield license
+                else:
+                    inactive.write(license)
+
+        export_rows, unpaired = _match(batch, _export_rows(system_name, export_path, stats),
+                                       active_licenses(), run_dir, 'active')
+        for license in unpaired:
+            batch.add('deactivations', license['license_id'])
+        export_rows, _ = _match(batch, export_rows, inactive.read(), run_dir, 'inactive')
+        for row in export_rows:
+            batch.add('inserts', row)
+        batch.flush()
+
+    summary = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'system': system_name,
+        'export_file': os.path.basename(export_path),
+        'dry_run': dry_run,
+        'duration_seconds': round(time.monotonic() - started, 2),
+        **stats
+    }
+    with open(SYNC_LOG_PATH, 'a', encoding='utf-8') as log:
+        log.write(json.dumps(summary) + '\n')
+    print(f"INFO: Sync summary: {summary}")
+    return summary
+
+
+def _next_group(groups):
+    """Returns (key, items) for the next group of (key, item) pairs, or (None, None)."""
+    for key, pairs in groups:
+        return key, [item for _, item in pairs]
+    return None, None
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 3:
+        print("Usage: python -m services.sync_service <SYSTEM> <export.csv|export.jsonl> [--dry-run]")
+        sys.exit(1)
+    reconcile_system(sys.argv[1], sys.argv[2], dry_run='--dry-run' in sys.argv[3:])
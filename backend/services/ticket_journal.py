@@ -0,0 +1,296 @@
+"""
+Durable write-behind queue for ticket inserts (optional, TICKET_WRITE_BEHIND=1).
+
+Tickets are appended to a per-process journal file and fsynced, then the caller
+is acknowledged. A background thread inserts pending entries in batched
+multi-row transactions; the same transaction records the journal's last applied
+sequence number in `ticket_journal_checkpoints`, so a crash can never apply an
+entry twice. On startup, journals left behind by dead processes are replayed
+past their checkpoint and removed, and checkpoints of journals removed more than
+CHECKPOINT_RETENTION_SECONDS ago are deleted.
+
+Readers call collect_unflushed() before querying tickets: it flushes this
+process's queue and returns entries other processes have acknowledged but not
+yet committed, so listings never miss an acknowledged ticket.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+from models.db_connection import get_db_connection
+
+TICKET_INSERT_QUERY = """
+INSERT INTO `tickets` (`ticket_id`, `action_description`, `status`, `timestamp`, `notes`)
+VALUES (%s, %s, %s, %s, %s)
+"""
+CHECKPOINT_QUERY = """
+INSERT INTO `ticket_journal_checkpoints` (`journal`, `seq`) VALUES (%s, %s)
+ON DUPLICATE KEY UPDATE `seq` = VALUES(`seq`)
+"""
+
+FLUSH_INTERVAL_SECONDS = 0.2
+FLUSH_BATCH_SIZE = 500
+RETRY_BACKOFF_SECONDS = 2
+# A removed journal's checkpoint is kept this long, so readers still holding its
+# entries from collect_unflushed() can filter them against it
+CHECKPOINT_RETENTION_SECONDS = 3600
+
+_journal_dir = None
+_state = None   # per-process journal state, recreated after fork
+_state_lock = threading.Lock()
+
+
+def enable(journal_dir):
+    """Turns on write-behind with journals stored in `journal_dir`."""
+    global _journal_dir
+    os.makedirs(journal_dir, exist_ok=True)
+    _journal_dir = journal_dir
+
+
+def is_enabled():
+    return _journal_dir is not None
+
+
+class _Journal:
+    """One process's journal file, pending queue and flusher thread."""
+
+    def __init__(self, journal_dir):
+        self.name = f"tickets-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.path = os.path.join(journal_dir, f"{self.name}.jsonl")
+        self.file = open(self.path, 'a+', encoding='utf-8')
+        fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)  # marks the journal as live
+        self.pid = os.getpid()
+        self.seq = 0
+        self.pending = deque()  # (seq, params) not yet committed
+        self.append_lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='ticket-journal-flusher', daemon=True)
+        self.thread.start()
+
+    def append(self, params):
+        with self.append_lock:
+            self.seq += 1
+            self.file.write(json.dumps({'seq': self.seq, 'params': list(params)}) + '\n')
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.pending.append((self.seq, tuple(params)))
+        if len(self.pending) >= FLUSH_BATCH_SIZE:
+            self.wakeup.set()
+
+    def flush(self):
+        """Commits everything pending in batched transactions; raises on database errors."""
+        with self.flush_lock:
+            while self.pending:
+                batch = list(self.pending)[:FLUSH_BATCH_SIZE]
+                _apply_batch(self.name, batch)
+                with self.append_lock:
+                    for _ in batch:
+                        self.pending.popleft()
+                    if not self.pending:
+                        # Everything is committed and checkpointed; start the file afresh
+                        self.file.truncate(0)
+                        self.file.flush()
+                        os.fsync(self.file.fileno())
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(FLUSH_INTERVAL_SECONDS)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"ERROR: Ticket journal flush failed, will retry: {e}")
+                time.sleep(RETRY_BACKOFF_SECONDS)
+
+
+def _apply_batch(journal_name, batch):
+    """Inserts a batch of journal entries and advances the checkpoint atomically."""
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.executemany(TICKET_INSERT_QUERY, [params for _, params in batch])
+        cursor.execute(CHECKPOINT_QUERY, (journal_name, batch[-1][0]))
+        conn.commit()
+        print(f"DEBUG: Flushed {len(batch)} journaled tickets from {journal_name}")
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def _read_entries(path):
+    """Reads journal entries, ignoring a torn final line from a crash mid-write."""
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            entries.append((entry['seq'], tuple(entry['params'])))
+    return entries
+
+
+def _load_checkpoints(cursor, names):
+    if not names:
+        return {}
+    cursor.execute(
+        f"SELECT `journal`, `seq` FROM `ticket_journal_checkpoints` WHERE `journal` IN ({', '.join(['%s'] * len(names))})",
+        tuple(names)
+    )
+    return dict(cursor.fetchall())
+
+
+def _touch_checkpoint(journal_name):
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "UPDATE `ticket_journal_checkpoints` SET `updated_at` = CURRENT_TIMESTAMP WHERE `journal` = %s",
+            (journal_name,)
+        )
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+def _recover_orphans(own_path):
+    """Replays and deletes journals whose owning process is gone (their lock is free)."""
+    for path in glob.glob(os.path.join(_journal_dir, 'tickets-*.jsonl')):
+        if path == own_path:
+            continue
+        try:
+            f = open(path, encoding='utf-8')
+        except FileNotFoundError:
+            continue  # recovered and removed by another process
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                continue  # still owned by a live process
+            if os.fstat(f.fileno()).st_nlink == 0:
+                continue  # another process recovered it while we waited for the lock
+            name = os.path.splitext(os.path.basename(path))[0]
+            conn = get_db_connection()
+            try:
+                cursor = conn.cursor()
+                applied = _load_checkpoints(cursor, [name]).get(name, 0)
+                cursor.close()
+            finally:
+                conn.close()
+            remaining = [entry for entry in _read_entries(path) if entry[0] > applied]
+            for start in range(0, len(remaining), FLUSH_BATCH_SIZE):
+                _apply_batch(name, remaining[start:start + FLUSH_BATCH_SIZE])
+            _touch_checkpoint(name)  # its retention starts now, when readers stop seeing the file
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            print(f"INFO: Recovered {len(remaining)} tickets from orphaned journal {name}")
+
+
+def _prune_checkpoints():
+    """
+    Deletes checkpoints of journals no longer on disk (recovered and removed)
+    that have not changed for CHECKPOINT_RETENTION_SECONDS; recovery touches a
+    checkpoint when it removes the journal.
+    """
+    # Listed before querying: a journal created meanwhile has a fresh checkpoint
+    on_disk = {os.path.splitext(os.path.basename(path))[0]
+               for path in glob.glob(os.path.join(_journal_dir, 'tickets-*.jsonl'))}
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT `journal` FROM `ticket_journal_checkpoints` WHERE `updated_at` < NOW() - INTERVAL %s SECOND",
+            (CHECKPOINT_RETENTION_SECONDS,)
+        )
+        stale = [name for (name,) in cursor.fetchall() if name not in on_disk]
+        for start in range(0, len(stale), FLUSH_BATCH_SIZE):
+            names = stale[start:start + FLUSH_BATCH_SIZE]
+            cursor.execute(
+                f"DELETE FROM `ticket_journal_checkpoints` WHERE `journal` IN ({', '.join(['%s'] * len(names))}) "
+                f"AND `updated_at` < NOW() - INTERVAL %s SECOND",
+                (*names, CHECKPOINT_RETENTION_SECONDS)
+            )
+        conn.commit()
+        cursor.close()
+        if stale:
+            print(f"INFO: Pruned {len(stale)} checkpoints of removed ticket journals")
+    finally:
+        conn.close()
+
+
+def _journal():
+    """Returns this process's journal, (re)creating it after startup or fork."""
+    global _state
+    with _state_lock:
+        if _state is None or _state.pid != os.getpid():
+            _state = _Journal(_journal_dir)
+            try:
+                _recover_orphans(_state.path)
+                _prune_checkpoints()
+            except Exception as e:
+                print(f"WARNING: Ticket journal recovery failed, will retry on restart: {e}")
+        return _state
+
+
+def append_ticket(params):
+    """Durably journals a ticket insert (params as in TICKET_INSERT_QUERY) and returns."""
+    _journal().append(params)
+
+
+def collect_unflushed():
+    """
+    Flushes this process's pending tickets and returns {journal name: entries}
+    for tickets acknowledged by any process but possibly not yet committed.
+    Call it before opening the snapshot used to read tickets, then drop entries
+    at or below that snapshot's checkpoint for their journal (see filter_unflushed).
+    """
+    journal = _journal()
+    try:
+        journal.flush()
+    except Exception as e:
+        print(f"WARNING: Could not flush ticket journal before read: {e}")
+
+    others = {}
+    for path in glob.glob(os.path.join(_journal_dir, 'tickets-*.jsonl')):
+        name = os.path.splitext(os.path.basename(path))[0]
+        try:
+            entries = _read_entries(path)
+        except FileNotFoundError:
+            continue  # removed by recovery after its entries were committed
+        if entries:
+            others[name] = entries
+    return others
+
+
+def filter_unflushed(cursor, unflushed):
+    """Returns the params of entries in `unflushed` past their committed checkpoint."""
+    checkpoints = _load_checkpoints(cursor, list(unflushed))
+    return [params for name, entries in unflushed.items()
+            for seq, params in entries if seq > checkpoints.get(name, 0)]
+
+
+@atexit.register
+def _flush_on_exit():
+    if _state is not None and _state.pid == os.getpid():
+        try:
+            _state.flush()
+        except Exception as e:
+            print(f"WARNING: Ticket journal not fully flushed at exit; it will be recovered: {e}")
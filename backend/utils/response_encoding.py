@@ -0,0 +1,94 @@
+import gzip
+import json
+from flask import Response
+
+_brotli = None
+
+def _load_brotli():
+    """Imports brotli on first use; it is optional, so returns False when missing."""
+    global _brotli
+    if _brotli is None:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:  # fall back to gzip only
+            _brotli = False
+    return _brotli
+
+# Media type the frontend asks for when it can decode the columnar listing shape
+COLUMNAR_MIMETYPE = 'application/vnd.license-tracker.columnar+json'
+
+# Low-cardinality columns that are sent as indexes into a per-response dictionary
+DICTIONARY_FIELDS = ('system', 'status', 'request_type')
+
+# Responses smaller than this are not worth the CPU cost of compressing
+COMPRESSION_THRESHOLD_BYTES = 1024
+
+
+def wants_columnar(req):
+    """
+    Returns True if the client negotiated the columnar encoding, either through
+    the Accept header or an explicit `format=columnar` query parameter.
+    """
+    if req.args.get('format') == 'columnar':
+        return True
+    return req.accept_mimetypes[COLUMNAR_MIMETYPE] > req.accept_mimetypes['application/json']
+
+
+def encode_columnar(columns, rows, dictionary_fields=DICTIONARY_FIELDS):
+    """
+    Encodes row tuples (ordered like `columns`) as a "columns + row arrays"
+    payload. Columns listed in `dictionary_fields` are replaced by an index into
+    `dictionaries[column]`, so repeated values like 'Active' are sent once.
+    """
+    columns = list(columns)
+    positions = [(i, {}) for i, col in enumerate(columns) if col in dictionary_fields]
+
+    encoded_rows = []
+    for row in rows:
+        values = list(row)
+        for i, lookup in positions:
+            values[i] = lookup.setdefault(values[i], len(lookup))
+        encoded_rows.append(values)
+
+    return {
+        'format': 'columnar',
+        'columns': columns,
+        'dictionaries': {columns[i]: list(lookup.keys()) for i, lookup in positions},
+        'rows': encoded_rows
+    }
+
+
+def _encode_record(value):
+    """
+    json.dumps hook for record objects (see models.records): each record becomes
+    a dict only while it is being written, so a listing never holds one per row.
+    """
+    to_dict = getattr(value, 'to_dict', None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_dict()
+
+
+def build_response(req, payload, mimetype='application/json'):
+    """
+    Serializes `payload` (which may contain records) compactly and compresses it
+    with brotli or gzip when the client accepts it and the body exceeds
+    COMPRESSION_THRESHOLD_BYTES.
+    """
+    body = json.dumps(payload, separators=(',', ':'), default=_encode_record).encode('utf-8')
+    response = Response(body, mimetype=mimetype)
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+
+    if len(body) < COMPRESSION_THRESHOLD_BYTES:
+        return response
+
+    accepted = req.accept_encodings
+    if accepted['br'] and _load_brotli():
+        response.set_data(_brotli.compress(body, quality=4))
+        response.headers['Content-Encoding'] = 'br'
+    elif accepted['gzip']:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
@@ -0,0 +1,24 @@
+-- SQL Script for hot/cold separation of licenses and tickets
+-- Run after license_tracker_db.sql. Archive tables mirror the hot tables and use
+-- compressed rows, since archived rows (removal JSON, attachments) are rarely read.
+--
+-- Native partitioning of `licenses` by status or of `tickets` by month is not used:
+-- MySQL requires the partition column in every unique key, which would mean changing
+-- the UUID / auto-increment primary keys the application relies on.
+USE `license_tracker_db`;
+
+CREATE TABLE IF NOT EXISTS `licenses_archive` LIKE `licenses`;
+ALTER TABLE `licenses_archive`
+    ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8,
+    ADD COLUMN `archived_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+CREATE TABLE IF NOT EXISTS `tickets_archive` LIKE `tickets`;
+ALTER TABLE `tickets_archive`
+    ROW_FORMAT=COMPRESSED KEY_BLOCK_SIZE=8,
+    ADD COLUMN `archived_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP;
+
+-- Hot queries filter on status (and date); these let them skip inactive/closed rows
+CREATE INDEX idx_licenses_status_assignment_date ON `licenses` (`status`, `assignment_date`);
+CREATE INDEX idx_tickets_status_timestamp ON `tickets` (`status`, `timestamp`);
+CREATE INDEX idx_licenses_archive_assignment_date ON `licenses_archive` (`assignment_date`);
+CREATE INDEX idx_tickets_archive_timestamp ON `tickets_archive` (`timestamp`);
@@ -0,0 +1,8 @@
+-- SQL Script for external seat export reconciliation (services/sync_service.py)
+-- Stores a content hash of the last synced export row so unchanged rows are skipped.
+USE `license_tracker_db`;
+
+ALTER TABLE `licenses` ADD COLUMN `sync_hash` CHAR(40) NULL AFTER `requestor_name`;
+
+-- The sync job streams each system's licenses; this keeps that scan on one index range
+CREATE INDEX idx_licenses_system_status ON `licenses` (`system`, `status`);
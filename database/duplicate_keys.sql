@@ -0,0 +1,18 @@
+-- SQL Script for the cross-system duplicate seat report (GET /api/licenses/duplicates)
+-- Adds normalized person keys as stored generated columns, so MySQL keeps them in
+-- step with every write, and indexes them for set-based grouping.
+USE `license_tracker_db`;
+
+ALTER TABLE `licenses`
+    ADD COLUMN `email_key` VARCHAR(255)
+        GENERATED ALWAYS AS (NULLIF(LOWER(TRIM(`email`)), '')) STORED,
+    ADD COLUMN `mobile_key` VARCHAR(20)
+        GENERATED ALWAYS AS (NULLIF(RIGHT(REGEXP_REPLACE(`mobile`, '[^0-9]', ''), 10), '')) STORED;
+
+-- Leading on status lets the report scan only Active rows, already ordered by key;
+-- the primary key (`id`) is implicitly included, so the grouping is index-only.
+CREATE INDEX idx_licenses_status_email_key ON `licenses` (`status`, `email_key`, `system`);
+CREATE INDEX idx_licenses_status_mobile_key ON `licenses` (`status`, `mobile_key`, `system`);
+
+-- The report's incremental refresh looks up licenses written since its last refresh
+CREATE INDEX idx_licenses_updated_at ON `licenses` (`updated_at`);
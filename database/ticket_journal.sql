@@ -0,0 +1,10 @@
+-- SQL Script for the optional ticket write-behind journal (TICKET_WRITE_BEHIND=1)
+-- Each journal's last committed sequence number is written in the same transaction
+-- as its batched ticket inserts, so crash recovery never inserts a ticket twice.
+USE `license_tracker_db`;
+
+CREATE TABLE IF NOT EXISTS `ticket_journal_checkpoints` (
+    `journal` VARCHAR(100) PRIMARY KEY,
+    `seq` BIGINT NOT NULL,
+    `updated_at` TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
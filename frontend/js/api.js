@@ -7,6 +7,28 @@ import { showCustomModal } from './dom.js';
 //export const API_BASE_URL = 'http://127.0.0.1:7878/api';
 export const API_BASE_URL = window.location.origin + '/api';
 
+// Compact "columns + rows" encoding served by listing endpoints such as /licenses
+const COLUMNAR_MIMETYPE = 'application/vnd.license-tracker.columnar+json';
+
+/**
+ * Expands a columnar payload back into an array of row objects.
+ * Dictionary-encoded columns hold an index into `payload.dictionaries[column]`.
+ * @param {Object} payload - The decoded columnar response body.
+ * @returns {Array<Object>} The rows as plain objects.
+ */
+function decodeColumnar(payload) {
+    const { columns, dictionaries, rows } = payload;
+    return rows.map(values => {
+        const row = {};
+        for (let i = 0; i < columns.length; i++) {
+            const column = columns[i];
+            const dictionary = dictionaries[column];
+            row[column] = dictionary ? dictionary[values[i]] : values[i];
+        }
+        return row;
+    });
+}
+
 
 /**
  * Fetches data from a given endpoint.
@@ -23,11 +45,17 @@ export async function fetchData(endpoint, queryParams = {}) {
     });
 
     try {
-        const response = await fetch(url);
+        const response = await fetch(url, {
+            headers: { 'Accept': `${COLUMNAR_MIMETYPE}, application/json;q=0.9` }
+        });
         if (!response.ok) {
             const errorBody = await response.json().catch(() => ({ message: 'Unknown error' }));
             throw new Error(`HTTP error! status: ${response.status} - ${errorBody.message || response.statusText}`);
         }
+        const contentType = response.headers.get('Content-Type') || '';
+        if (contentType.startsWith(COLUMNAR_MIMETYPE)) {
+            return decodeColumnar(await response.json());
+        }
         return await response.json();
     } catch (error) {
         console.error(`Error fetching data from ${endpoint}:`, error);
@@ -75,8 +103,31 @@ export async function loadInitialData() {
     console.log("Data fetched from backend:", { licenses: state.licenses, tickets: state.tickets });
 }
 
+/**
+ * Fetches monthly category analytics for one system from the unified
+ * /analytics endpoint and stores the chart series in the shared state.
+ * @param {string} systemName - The system name (e.g., 'DMS', 'LSQ').
+ * @returns {Promise<Object>} The distribution and assignment trend series.
+ */
 export async function fetchSystemAnalytics(systemName) {
-    return await fetchData('/system-analytics', { system: systemName });
+    const data = await fetchData('/analytics', { systems: systemName, group_by: 'category', bucket: 'month' });
+    const rows = (data.systems && data.systems[systemName]) || [];
+
+    const distribution = {};
+    const trends = {};
+    rows.forEach(row => {
+        distribution[row.category] = (distribution[row.category] || 0) + row.count;
+        trends[row.period] = (trends[row.period] || 0) + row.count;
+    });
+
+    state.systemAnalyticsData = {
+        distribution: Object.entries(distribution).map(([category, count]) => ({
+            category: category === 'null' ? null : category,
+            count
+        })),
+        assignment_trends: Object.entries(trends).map(([month, count]) => ({ month, count }))
+    };
+    return state.systemAnalyticsData;
 }
 
 export async function fetchAndUpdateAllData() {
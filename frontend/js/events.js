@@ -83,6 +83,14 @@ document.getElementById('search-query').addEventListener('keyup', (event) => {
     }
 });
 
+// Typeahead suggestions from the in-memory search index, debounced per keystroke
+let suggestTimer = null;
+document.getElementById('search-query').addEventListener('input', (event) => {
+    clearTimeout(suggestTimer);
+    const query = event.target.value.trim();
+    suggestTimer = setTimeout(() => loadSearchSuggestions(query), 150);
+});
+
 // Remove License form submission
 document.getElementById('remove-license-form').addEventListener('submit', handleRemoveLicenseSubmit);
 
@@ -304,7 +312,7 @@ export async function searchLicenses(isReset = false) {
     const endDate = isReset ? '' : document.getElementById('removeFilterEndDate').value;
 
     const queryParams = {
-        search: query,
+        query: query,
         system: systemFilter,
         status: statusFilter,
         assignment_date_start: startDate,
@@ -315,6 +323,26 @@ export async function searchLicenses(isReset = false) {
     renderSearchResults(results);
 }
 
+/**
+ * Fills the search box's datalist with typeahead matches for the given query.
+ * @param {string} query - The current search input.
+ */
+export async function loadSearchSuggestions(query) {
+    const datalist = document.getElementById('search-query-suggestions');
+    if (query.length < 2) {
+        datalist.innerHTML = '';
+        return;
+    }
+    const suggestions = await fetchData('/licenses/suggest', { q: query, limit: 8 });
+    datalist.innerHTML = '';
+    suggestions.forEach(item => {
+        const option = document.createElement('option');
+        option.value = item.email || item.name;
+        option.label = `${item.name} (${item.system}, ${item.status})`;
+        datalist.appendChild(option);
+    });
+}
+
 /**
  * Handles the submission of the Remove License form.
  */